@@ -1,9 +1,9 @@
 import numpy as np
-import pandas as pd
-from scipy.stats import linregress
-from statsmodels.tsa.stattools import adfuller
+from collections import deque
+from datetime import datetime, timedelta
 from typing import Optional
-from models import Tick, OHLCV
+from models import Tick, OHLCV, MicrostructureResult
+from ring_buffer import ticks_to_columns
 
 class Analytics:
     """Compute trading analytics. All functions are pure (no side effects)."""
@@ -23,6 +23,8 @@ class Analytics:
         if not ticks:
             return []
         
+        import pandas as pd  # Deferred: pandas is slow to import and only needed here
+        
         df = pd.DataFrame([
             {
                 'symbol': t.symbol,
@@ -51,6 +53,90 @@ class Analytics:
         
         return ohlcv_list
     
+    @staticmethod
+    def compute_ohlcv_columns(symbol: str, columns: dict[str, np.ndarray], window_seconds: int) -> list[OHLCV]:
+        """
+        Vectorized OHLCV + VWAP from tick columns (see TickDatabase.get_tick_columns).
+        
+        Args:
+            symbol: Symbol the columns belong to
+            columns: timestamp (epoch ms), price, size arrays sorted by timestamp
+            window_seconds: Resample interval (60 for 1m, 300 for 5m)
+        
+        Returns:
+            List of OHLCV candles
+        """
+        ts = columns["timestamp"]
+        if len(ts) == 0:
+            return []
+        
+        price = columns["price"]
+        size = columns["size"]
+        width = window_seconds * 1000
+        buckets = ts // width * width
+        
+        # Ticks are sorted, so each bucket is a contiguous run
+        ends = np.flatnonzero(np.diff(buckets)) + 1
+        starts = np.concatenate(([0], ends))
+        lasts = np.concatenate((ends - 1, [len(ts) - 1]))
+        
+        volume = np.add.reduceat(size, starts)
+        notional = np.add.reduceat(price * size, starts)
+        vwap = np.divide(notional, volume, out=np.full_like(volume, np.nan), where=volume > 0)
+        
+        bins = buckets[starts].astype("datetime64[ms]").astype(datetime)
+        firsts = ts[starts].astype("datetime64[ms]").astype(datetime)
+        finals = ts[lasts].astype("datetime64[ms]").astype(datetime)
+        return [
+            OHLCV(
+                symbol=symbol,
+                timestamp=bins[i],
+                open=price[starts[i]],
+                high=high,
+                low=low,
+                close=price[lasts[i]],
+                volume=volume[i],
+                vwap=None if np.isnan(vwap[i]) else float(vwap[i]),
+                first_trade_at=firsts[i],
+                last_trade_at=finals[i],
+            )
+            for i, (high, low) in enumerate(zip(
+                np.maximum.reduceat(price, starts),
+                np.minimum.reduceat(price, starts),
+            ))
+        ]
+    
+    @staticmethod
+    def resample_bars(bars: list[OHLCV], window_seconds: int) -> list[OHLCV]:
+        """
+        Merge bars sorted by timestamp (e.g. stored 1m bars) into window_seconds bars.
+        
+        Bars landing in the same bucket are combined. Open/close follow the
+        first/last trade times when both bars have them, so overlapping bars
+        built from different tick sets merge correctly; otherwise the later
+        bar in the list supplies the close.
+        """
+        merged: list[OHLCV] = []
+        for bar in bars:
+            epoch = (bar.timestamp - datetime(1970, 1, 1)).total_seconds()
+            bin_ts = datetime(1970, 1, 1) + timedelta(seconds=epoch // window_seconds * window_seconds)
+            notional = (bar.vwap or 0.0) * bar.volume
+            
+            if merged and merged[-1].timestamp == bin_ts:
+                last = merged[-1]
+                last_notional = (last.vwap or 0.0) * last.volume
+                if bar.first_trade_at and last.first_trade_at and bar.first_trade_at < last.first_trade_at:
+                    last.open, last.first_trade_at = bar.open, bar.first_trade_at
+                if not (bar.last_trade_at and last.last_trade_at) or bar.last_trade_at >= last.last_trade_at:
+                    last.close, last.last_trade_at = bar.close, bar.last_trade_at
+                last.high = max(last.high, bar.high)
+                last.low = min(last.low, bar.low)
+                last.volume += bar.volume
+                last.vwap = (last_notional + notional) / last.volume if last.volume > 0 else None
+            else:
+                merged.append(bar.model_copy(update={"timestamp": bin_ts}))
+        return merged
+    
     @staticmethod
     def compute_zscore(ticks: list[Tick], window: int = 20) -> Optional[float]:
         """
@@ -102,6 +188,9 @@ class Analytics:
         if len(ticks) < min_obs:
             return None
         
+        # Deferred: statsmodels dominates startup time and is only needed here
+        from statsmodels.tsa.stattools import adfuller
+        
         prices = np.array([t.price for t in ticks])
         try:
             result = adfuller(prices, autolag='AIC')
@@ -148,9 +237,163 @@ class Analytics:
         if prices1.std() < 1e-8:
             return None
         
+        from scipy.stats import linregress  # Deferred import, see compute_adf_test
+        
         try:
             slope, intercept, r_value, p_value, std_err = linregress(prices1, prices2)
             return float(slope)
         except Exception as e:
             print(f"Hedge ratio computation failed: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    @staticmethod
+    def compute_engle_granger(y: np.ndarray, x: np.ndarray) -> Optional[dict]:
+        """
+        Engle-Granger two-step cointegration test on two (log) price series.
+        
+        1. OLS y = alpha + beta * x gives the hedge ratio beta.
+        2. ADF on the residual spread; p-value from MacKinnon's cointegration
+           tables (as statsmodels.coint does), not the plain ADF ones.
+        
+        Also returns the spread's mean-reversion half-life in samples.
+        A side-effect-free staticmethod, so workers can pickle it by qualified
+        name (Analytics.compute_engle_granger) and run it in a process pool.
+        """
+        if len(y) < 30 or len(y) != len(x) or x.std() < 1e-12:
+            return None
+        
+        from statsmodels.tsa.stattools import adfuller
+        from statsmodels.tsa.adfvalues import mackinnonp
+        
+        try:
+            design = np.column_stack([np.ones_like(x), x])
+            (alpha, beta), *_ = np.linalg.lstsq(design, y, rcond=None)
+            resid = y - alpha - beta * x
+            
+            adf_stat = float(adfuller(resid, autolag="AIC", regression="n")[0])
+            pvalue = float(mackinnonp(adf_stat, regression="c", N=2))
+            
+            # Ornstein-Uhlenbeck fit: d(resid) = lam * resid(t-1) + e
+            lagged = resid[:-1] - resid[:-1].mean()
+            lam = float(np.dot(lagged, np.diff(resid)) / np.dot(lagged, lagged))
+            half_life = float(-np.log(2) / lam) if lam < 0 else None
+            
+            return {
+                "hedge_ratio": float(beta),
+                "intercept": float(alpha),
+                "adf_stat": adf_stat,
+                "pvalue": pvalue,
+                "half_life": half_life,
+            }
+        except Exception as e:
+            print(f"Engle-Granger test failed: {e}")
+            return None
+
+class Microstructure:
+    """
+    Streaming order-flow metrics for one symbol over a rolling time window.
+    
+    State is updated incrementally: each batch is appended as a numpy chunk and
+    running sums are adjusted for what enters and what ages out, so an update
+    costs O(batch) rather than O(window).
+    """
+    
+    def __init__(self, symbol: str, window_seconds: float = 60.0):
+        self.symbol = symbol.lower()
+        self.window_ms = int(window_seconds * 1000)
+        self.cvd = 0.0  # Cumulative volume delta since start (never windowed)
+        self._chunks: deque = deque()  # (ts_ms, price, size, signed_size, sq_logret)
+        self._last_price: Optional[float] = None
+        self._last_ts: Optional[int] = None
+        self._sums = np.zeros(5)  # buy_vol, sell_vol, notional, volume, sum_sq_logret
+        self._count = 0
+    
+    def update(self, ticks: list[Tick]) -> None:
+        """Fold a chronological batch of ticks into the window."""
+        if not ticks:
+            return
+        columns = ticks_to_columns(ticks)
+        self.update_columns(columns["timestamp"], columns["price"], columns["size"], columns["side"])
+    
+    def update_columns(self, ts: np.ndarray, price: np.ndarray, size: np.ndarray, side: np.ndarray) -> None:
+        """
+        Vectorized update from columns (timestamp ms, price, size, side +1/-1/0).
+        
+        Ticks with unknown side (0) count toward VWAP/intensity/volatility but not
+        toward buy/sell volume or CVD.
+        """
+        if len(ts) == 0:
+            return
+        
+        signed = size * side
+        prev = np.concatenate(([price[0] if self._last_price is None else self._last_price], price[:-1]))
+        sq_logret = np.log(price / prev) ** 2
+        
+        self._sums += (
+            size[side > 0].sum(),
+            size[side < 0].sum(),
+            (price * size).sum(),
+            size.sum(),
+            sq_logret.sum(),
+        )
+        self._count += len(ts)
+        self.cvd += float(signed.sum())
+        self._chunks.append((ts, price, size, signed, sq_logret))
+        self._last_price = float(price[-1])
+        self._last_ts = int(ts[-1])
+        
+        self._evict(self._last_ts - self.window_ms)
+    
+    def _evict(self, cutoff: int) -> None:
+        """Drop ticks older than ``cutoff`` (ms) and subtract them from the sums."""
+        while self._chunks:
+            ts, price, size, signed, sq_logret = self._chunks[0]
+            n = int(np.searchsorted(ts, cutoff, side="left"))
+            if n == 0:
+                break
+            
+            self._sums -= (
+                size[:n][signed[:n] > 0].sum(),
+                size[:n][signed[:n] < 0].sum(),
+                (price[:n] * size[:n]).sum(),
+                size[:n].sum(),
+                sq_logret[:n].sum(),
+            )
+            self._count -= n
+            
+            if n == len(ts):
+                self._chunks.popleft()
+            else:
+                self._chunks[0] = (ts[n:], price[n:], size[n:], signed[n:], sq_logret[n:])
+                break
+        
+        if not self._chunks:
+            # Reset accumulated float drift whenever the window empties
+            self._sums[:] = 0.0
+            self._count = 0
+    
+    def snapshot(self) -> MicrostructureResult:
+        """Current metrics for the window ending at the latest tick."""
+        buy, sell, notional, volume, sum_sq = (float(x) for x in self._sums)
+        
+        imbalance = None
+        if buy + sell > 1e-12:
+            imbalance = (buy - sell) / (buy + sell)
+        
+        intensity = None
+        if self._count > 1:
+            span_ms = self._last_ts - int(self._chunks[0][0][0])
+            intensity = self._count / max(span_ms / 1000.0, 1e-3)
+        
+        return MicrostructureResult(
+            symbol=self.symbol,
+            window_seconds=self.window_ms / 1000.0,
+            buy_volume=buy,
+            sell_volume=sell,
+            imbalance=imbalance,
+            cvd=self.cvd,
+            vwap=notional / volume if volume > 1e-12 else None,
+            trade_intensity=intensity,
+            realized_volatility=float(np.sqrt(max(sum_sq, 0.0))) if self._count > 1 else None,
+            tick_count=self._count,
+        )
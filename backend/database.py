@@ -1,11 +1,15 @@
 import sqlite3
 import logging
-from datetime import datetime
-from models import Tick
+import numpy as np
+from datetime import datetime, timedelta
+from models import Tick, OHLCV, SIDE_SIGN, NO_TRADE_ID
+from analytics import Analytics
 from threading import Lock
 
 logger = logging.getLogger(__name__)
 
+COMPACT_INTERVAL = 60  # Seconds per bar that expiring raw ticks are rolled up into
+
 class TickDatabase:
     """SQLite database for storing and querying ticks."""
     
@@ -18,6 +22,12 @@ class TickDatabase:
         """Create tables if they don't exist."""
         try:
             with sqlite3.connect(self.db_path, timeout=10) as conn:
+                # Must precede table creation to apply to new files; lets retention
+                # hand freed pages back to the OS a few at a time
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                # WAL: readers don't block the writer, and retention batches interleave with inserts
+                conn.execute("PRAGMA journal_mode = WAL")
+                
                 conn.execute("""
                 CREATE TABLE IF NOT EXISTS ticks (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -25,10 +35,18 @@ class TickDatabase:
                     timestamp TEXT NOT NULL,
                     price REAL NOT NULL,
                     size REAL NOT NULL,
+                    side TEXT,
+                    trade_id INTEGER,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
                 """)
                 
+                # Migrate databases created before side/trade_id were stored
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(ticks)")}
+                for column, ddl in (("side", "TEXT"), ("trade_id", "INTEGER")):
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE ticks ADD COLUMN {column} {ddl}")
+                
                 # Create indexes for fast queries
                 conn.execute("""
                 CREATE INDEX IF NOT EXISTS idx_symbol_ts 
@@ -40,6 +58,36 @@ class TickDatabase:
                 ON ticks(symbol)
                 """)
                 
+                # Retention scans by insertion age per symbol
+                conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_symbol_created 
+                ON ticks(symbol, created_at)
+                """)
+                
+                # Long-lived bars rolled up from expired raw ticks
+                conn.execute("""
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL,
+                    interval_seconds INTEGER NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    open REAL NOT NULL,
+                    high REAL NOT NULL,
+                    low REAL NOT NULL,
+                    close REAL NOT NULL,
+                    volume REAL NOT NULL,
+                    notional REAL NOT NULL,
+                    first_trade_at TEXT,
+                    last_trade_at TEXT,
+                    PRIMARY KEY (symbol, interval_seconds, timestamp)
+                )
+                """)
+                
+                # Migrate bars tables created before trade times were kept
+                existing = {row[1] for row in conn.execute("PRAGMA table_info(bars)")}
+                for column in ("first_trade_at", "last_trade_at"):
+                    if column not in existing:
+                        conn.execute(f"ALTER TABLE bars ADD COLUMN {column} TEXT")
+                
                 conn.commit()
                 logger.info(f"✅ Database initialized: {self.db_path}")
         except Exception as e:
@@ -52,13 +100,15 @@ class TickDatabase:
             with self.lock:
                 with sqlite3.connect(self.db_path, timeout=10) as conn:
                     conn.execute(
-                        """INSERT INTO ticks (symbol, timestamp, price, size) 
-                           VALUES (?, ?, ?, ?)""",
+                        """INSERT INTO ticks (symbol, timestamp, price, size, side, trade_id) 
+                           VALUES (?, ?, ?, ?, ?, ?)""",
                         (
                             tick.symbol.lower(),
                             tick.timestamp.isoformat(),
                             tick.price,
-                            tick.size
+                            tick.size,
+                            tick.side,
+                            tick.trade_id
                         )
                     )
                     conn.commit()
@@ -67,6 +117,27 @@ class TickDatabase:
         except Exception as e:
             logger.error(f"Insert error: {e}")
     
+    def insert_batch(self, ticks: list[Tick]) -> int:
+        """Insert many ticks in one transaction. Thread-safe. Returns rows inserted."""
+        if not ticks:
+            return 0
+        try:
+            with self.lock:
+                with sqlite3.connect(self.db_path, timeout=10) as conn:
+                    conn.executemany(
+                        """INSERT INTO ticks (symbol, timestamp, price, size, side, trade_id) 
+                           VALUES (?, ?, ?, ?, ?, ?)""",
+                        [
+                            (t.symbol.lower(), t.timestamp.isoformat(), t.price, t.size, t.side, t.trade_id)
+                            for t in ticks
+                        ]
+                    )
+                    conn.commit()
+            return len(ticks)
+        except Exception as e:
+            logger.error(f"Batch insert error: {e}")
+            return 0
+    
     def get_ticks(self, symbol: str, limit: int = 1000) -> list[Tick]:
         """Fetch last N ticks for a symbol, ordered chronologically."""
         try:
@@ -74,7 +145,7 @@ class TickDatabase:
                 with sqlite3.connect(self.db_path, timeout=10) as conn:
                     conn.row_factory = sqlite3.Row
                     rows = conn.execute(
-                        """SELECT symbol, timestamp, price, size 
+                        """SELECT symbol, timestamp, price, size, side, trade_id 
                            FROM ticks 
                            WHERE symbol = ? 
                            ORDER BY timestamp DESC 
@@ -88,7 +159,9 @@ class TickDatabase:
                     symbol=row['symbol'],
                     timestamp=datetime.fromisoformat(row['timestamp']),
                     price=row['price'],
-                    size=row['size']
+                    size=row['size'],
+                    side=row['side'],
+                    trade_id=row['trade_id']
                 )
                 for row in rows
             ]
@@ -99,6 +172,64 @@ class TickDatabase:
             logger.error(f"Query error for {symbol}: {e}")
             return []
     
+    def get_tick_columns(self, symbol: str, limit: int = 1000) -> dict[str, np.ndarray]:
+        """
+        Fetch last N ticks as numpy columns, oldest first.
+
+        Skips building Tick objects; timestamps are epoch-ms of the stored
+        wall-clock time. Used by the binary wire formats.
+        """
+        try:
+            with self.lock:
+                with sqlite3.connect(self.db_path, timeout=10) as conn:
+                    rows = conn.execute(
+                        """SELECT timestamp, price, size, side, trade_id 
+                           FROM ticks 
+                           WHERE symbol = ? 
+                           ORDER BY timestamp DESC 
+                           LIMIT ?""",
+                        (symbol.lower(), limit)
+                    ).fetchall()
+        except Exception as e:
+            logger.error(f"Column query error for {symbol}: {e}")
+            rows = []
+
+        rows.reverse()  # Chronological order (oldest first)
+        return self._rows_to_columns(rows)
+    
+    def get_tick_columns_by_timerange(self, symbol: str, start: datetime, end: datetime) -> dict[str, np.ndarray]:
+        """Fetch ticks within a time range as numpy columns, oldest first."""
+        try:
+            with self.lock:
+                with sqlite3.connect(self.db_path, timeout=10) as conn:
+                    rows = conn.execute(
+                        """SELECT timestamp, price, size, side, trade_id 
+                           FROM ticks 
+                           WHERE symbol = ? AND timestamp BETWEEN ? AND ?
+                           ORDER BY timestamp ASC""",
+                        (symbol.lower(), start.isoformat(), end.isoformat())
+                    ).fetchall()
+        except Exception as e:
+            logger.error(f"Column time range query error: {e}")
+            rows = []
+        
+        return self._rows_to_columns(rows)
+    
+    @staticmethod
+    def _rows_to_columns(rows: list[tuple]) -> dict[str, np.ndarray]:
+        """
+        (timestamp, price, size, side, trade_id) rows -> epoch-ms/float64 columns,
+        side as +1 buy / -1 sell / 0 unknown, missing trade ids as NO_TRADE_ID.
+        """
+        timestamps, prices, sizes, sides, trade_ids = zip(*rows) if rows else ((), (), (), (), ())
+        return {
+            "timestamp": np.array(timestamps, dtype="datetime64[us]").astype("datetime64[ms]").astype(np.int64),
+            "price": np.array(prices, dtype=np.float64),
+            "size": np.array(sizes, dtype=np.float64),
+            "side": np.array([SIDE_SIGN.get(side, 0) for side in sides], dtype=np.int64),
+            "trade_id": np.array([NO_TRADE_ID if t is None else t for t in trade_ids], dtype=np.int64),
+        }
+    
     def get_ticks_by_timerange(self, symbol: str, start: datetime, end: datetime) -> list[Tick]:
         """Fetch ticks within a time range."""
         try:
@@ -106,7 +237,7 @@ class TickDatabase:
                 with sqlite3.connect(self.db_path, timeout=10) as conn:
                     conn.row_factory = sqlite3.Row
                     rows = conn.execute(
-                        """SELECT symbol, timestamp, price, size 
+                        """SELECT symbol, timestamp, price, size, side, trade_id 
                            FROM ticks 
                            WHERE symbol = ? AND timestamp BETWEEN ? AND ?
                            ORDER BY timestamp ASC""",
@@ -118,7 +249,9 @@ class TickDatabase:
                     symbol=row['symbol'],
                     timestamp=datetime.fromisoformat(row['timestamp']),
                     price=row['price'],
-                    size=row['size']
+                    size=row['size'],
+                    side=row['side'],
+                    trade_id=row['trade_id']
                 )
                 for row in rows
             ]
@@ -141,18 +274,202 @@ class TickDatabase:
             logger.error(f"Count error: {e}")
             return 0
     
-    def delete_old_ticks(self, days: int = 1) -> int:
-        """Delete ticks older than N days (for cleanup)."""
+    def delete_old_ticks(self, days: int = 1, batch_size: int = 5000) -> int:
+        """
+        Delete ticks older than N days (for cleanup).
+        
+        Runs in small batches, releasing the lock between them so ingestion
+        isn't blocked. For rollup into bars and pacing, see RetentionService.
+        """
+        cutoff = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+        deleted = 0
+        for symbol in self.get_symbols():
+            while True:
+                rows = self.compact_ticks(symbol, cutoff, batch_size, rollup=False)[0]
+                deleted += rows
+                if rows < batch_size:
+                    break
+        return deleted
+    
+    def get_symbols(self) -> list[str]:
+        """Distinct symbols in ticks or bars, via index skip-scan (O(symbols * log n))."""
+        symbols = set()
+        try:
+            with self.lock:
+                with sqlite3.connect(self.db_path, timeout=10) as conn:
+                    for table in ("ticks", "bars"):
+                        symbol = ""
+                        while True:
+                            symbol = conn.execute(
+                                f"SELECT MIN(symbol) FROM {table} WHERE symbol > ?", (symbol,)
+                            ).fetchone()[0]
+                            if symbol is None:
+                                break
+                            symbols.add(symbol)
+        except Exception as e:
+            logger.error(f"Symbol scan error: {e}")
+        return sorted(symbols)
+    
+    def compact_ticks(self, symbol: str, cutoff: str, batch_size: int = 5000,
+                      rollup: bool = True) -> tuple[int, int]:
+        """
+        Remove one batch of ticks inserted before ``cutoff`` (UTC 'YYYY-MM-DD HH:MM:SS').
+        
+        With ``rollup``, the batch is first merged into COMPACT_INTERVAL bars in
+        the same transaction, so no trade drops out of the bar history. Batches walk
+        idx_symbol_created in arrival order, which need not be trade-time order
+        (e.g. uploaded history), so a stored bar's open/close are only replaced
+        by a batch whose first/last trade in that bar is earlier/later.
+        
+        Returns (ticks_deleted, bars_upserted).
+        """
+        try:
+            with self.lock:
+                with sqlite3.connect(self.db_path, timeout=10) as conn:
+                    rows = conn.execute(
+                        """SELECT id, timestamp, price, size, side, trade_id 
+                           FROM ticks 
+                           WHERE symbol = ? AND created_at < ? 
+                           ORDER BY created_at, id 
+                           LIMIT ?""",
+                        (symbol, cutoff, batch_size)
+                    ).fetchall()
+                    if not rows:
+                        return 0, 0
+                    
+                    bars = []
+                    if rollup:
+                        rows.sort(key=lambda r: r[1])
+                        columns = self._rows_to_columns([r[1:] for r in rows])
+                        bars = Analytics.compute_ohlcv_columns(symbol, columns, COMPACT_INTERVAL)
+                        # Trade times are ISO strings in one format, so they compare
+                        # lexically; bars from before the migration have NULL times
+                        conn.executemany(
+                            """INSERT INTO bars 
+                               (symbol, interval_seconds, timestamp, open, high, low, close, volume, notional, 
+                                first_trade_at, last_trade_at) 
+                               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) 
+                               ON CONFLICT (symbol, interval_seconds, timestamp) DO UPDATE SET 
+                                   open = CASE WHEN excluded.first_trade_at < first_trade_at 
+                                               THEN excluded.open ELSE open END, 
+                                   first_trade_at = min(first_trade_at, excluded.first_trade_at), 
+                                   high = max(high, excluded.high), 
+                                   low = min(low, excluded.low), 
+                                   close = CASE WHEN last_trade_at IS NULL OR excluded.last_trade_at >= last_trade_at 
+                                                THEN excluded.close ELSE close END, 
+                                   last_trade_at = max(last_trade_at, excluded.last_trade_at), 
+                                   volume = volume + excluded.volume, 
+                                   notional = notional + excluded.notional""",
+                            [
+                                (symbol, COMPACT_INTERVAL, b.timestamp.isoformat(), b.open, b.high,
+                                 b.low, b.close, b.volume, (b.vwap or 0.0) * b.volume,
+                                 b.first_trade_at.isoformat(), b.last_trade_at.isoformat())
+                                for b in bars
+                            ]
+                        )
+                    
+                    conn.executemany("DELETE FROM ticks WHERE id = ?", [(r[0],) for r in rows])
+                    conn.commit()
+                    return len(rows), len(bars)
+        except Exception as e:
+            logger.error(f"Compaction error for {symbol}: {e}")
+            return 0, 0
+    
+    def delete_old_bars(self, symbol: str, cutoff: datetime, batch_size: int = 5000) -> int:
+        """Delete one batch of stored bars starting before ``cutoff``."""
         try:
             with self.lock:
                 with sqlite3.connect(self.db_path, timeout=10) as conn:
                     cursor = conn.execute(
-                        """DELETE FROM ticks 
-                           WHERE created_at < datetime('now', '-' || ? || ' days')""",
-                        (days,)
+                        """DELETE FROM bars 
+                           WHERE rowid IN (
+                               SELECT rowid FROM bars 
+                               WHERE symbol = ? AND timestamp < ? 
+                               LIMIT ?
+                           )""",
+                        (symbol, cutoff.isoformat(), batch_size)
                     )
                     conn.commit()
                     return cursor.rowcount
         except Exception as e:
-            logger.error(f"Delete error: {e}")
-            return 0
\ No newline at end of file
+            logger.error(f"Bar delete error for {symbol}: {e}")
+            return 0
+    
+    def get_bars(self, symbol: str, interval_seconds: int, start: datetime, end: datetime) -> list[OHLCV]:
+        """Fetch stored (compacted) bars within a time range."""
+        try:
+            with self.lock:
+                with sqlite3.connect(self.db_path, timeout=10) as conn:
+                    rows = conn.execute(
+                        """SELECT timestamp, open, high, low, close, volume, notional, 
+                                  first_trade_at, last_trade_at 
+                           FROM bars 
+                           WHERE symbol = ? AND interval_seconds = ? AND timestamp BETWEEN ? AND ? 
+                           ORDER BY timestamp ASC""",
+                        (symbol.lower(), interval_seconds, start.isoformat(), end.isoformat())
+                    ).fetchall()
+            
+            return [
+                OHLCV(
+                    symbol=symbol.lower(),
+                    timestamp=datetime.fromisoformat(ts),
+                    open=o, high=h, low=l, close=c, volume=v,
+                    vwap=notional / v if v > 0 else None,
+                    first_trade_at=first and datetime.fromisoformat(first),
+                    last_trade_at=last and datetime.fromisoformat(last),
+                )
+                for ts, o, h, l, c, v, notional, first, last in rows
+            ]
+        except Exception as e:
+            logger.error(f"Bar query error: {e}")
+            return []
+    
+    def storage_stats(self) -> dict[str, int]:
+        """Page counts for the database file (for reclaimed-space reporting)."""
+        try:
+            with sqlite3.connect(self.db_path, timeout=10) as conn:
+                page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+                return {
+                    "page_size": page_size,
+                    "page_count": conn.execute("PRAGMA page_count").fetchone()[0],
+                    "freelist_count": conn.execute("PRAGMA freelist_count").fetchone()[0],
+                    "auto_vacuum": conn.execute("PRAGMA auto_vacuum").fetchone()[0],
+                }
+        except Exception as e:
+            logger.error(f"Storage stats error: {e}")
+            return {}
+    
+    def incremental_vacuum(self, pages: int) -> None:
+        """Return up to ``pages`` free pages to the OS (needs auto_vacuum=INCREMENTAL)."""
+        try:
+            with self.lock:
+                with sqlite3.connect(self.db_path, timeout=10) as conn:
+                    # executescript steps the pragma to completion; execute() would
+                    # stop after the first step and free a single page
+                    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        except Exception as e:
+            logger.error(f"Incremental vacuum error: {e}")
+    
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        One-off switch of an existing file to auto_vacuum=INCREMENTAL. The pragma
+        only reaches a file that already has tables through a full VACUUM, which
+        rewrites the file under the lock, so writers wait until it finishes.
+        """
+        try:
+            with self.lock:
+                with sqlite3.connect(self.db_path, timeout=10) as conn:
+                    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    conn.execute("VACUUM")
+            return True
+        except Exception as e:
+            logger.error(f"auto_vacuum conversion error: {e}")
+            return False
+    
+    def checkpoint(self) -> None:
+        """Passive WAL checkpoint: copies what it can without blocking writers."""
+        try:
+            with sqlite3.connect(self.db_path, timeout=10) as conn:
+                conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+        except Exception as e:
+            logger.error(f"WAL checkpoint error: {e}")
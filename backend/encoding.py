@@ -0,0 +1,194 @@
+import json
+import struct
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+
+from models import OHLCV
+
+try:
+    import msgpack
+except ImportError:  # optional: binary WebSocket frames fall back to JSON
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_MEDIA_TYPE = "application/vnd.quant.columnar"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+# Short names accepted in ?format= query params (browsers can't set headers on WebSockets)
+FORMAT_ALIASES = {
+    "json": JSON_MEDIA_TYPE,
+    "columnar": COLUMNAR_MEDIA_TYPE,
+    "msgpack": MSGPACK_MEDIA_TYPE,
+}
+
+COLUMNAR_MAGIC = b"QCOL"
+COLUMNAR_VERSION = 1
+
+# Column type codes -> little-endian numpy dtypes. Every type is 8 bytes wide so
+# all columns stay 8-byte aligned and can be viewed as Float64Array/BigInt64Array
+# in the browser without copying.
+_DTYPES = {
+    b"d": np.dtype("<f8"),
+    b"q": np.dtype("<i8"),
+}
+_CODES = {dtype: code for code, dtype in _DTYPES.items()}
+
+_HEADER = struct.Struct("<4sHHII")  # magic, version, n_cols, n_rows, meta_len
+
+_EPOCH = datetime(1970, 1, 1)
+_MS = timedelta(milliseconds=1)
+
+
+def _accept_ranked(accept: str) -> list[str]:
+    """Media types from an Accept header, best first: by q, then listed order. q=0 is dropped."""
+    ranked = []
+    for order, part in enumerate(accept.split(",")):
+        media_type, *params = (p.strip() for p in part.split(";"))
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            ranked.append((-q, order, media_type.lower()))
+    return [media_type for _, _, media_type in sorted(ranked)]
+
+
+def negotiate(accept: Optional[str], fmt: Optional[str] = None) -> str:
+    """
+    Pick a response media type.
+
+    An explicit ``fmt`` ("json", "columnar", "msgpack") wins over the Accept
+    header, whose entries are ranked by q-value and then by order. JSON is the
+    default (and what wildcards get), and MessagePack is only offered when the
+    ``msgpack`` package is installed.
+    """
+    candidates = []
+    if fmt:
+        candidates.append(FORMAT_ALIASES.get(fmt.lower(), ""))
+    if accept:
+        candidates.extend(_accept_ranked(accept))
+
+    for media_type in candidates:
+        if media_type in (JSON_MEDIA_TYPE, COLUMNAR_MEDIA_TYPE):
+            return media_type
+        if media_type == MSGPACK_MEDIA_TYPE and msgpack is not None:
+            return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def epoch_ms(ts: datetime) -> int:
+    """Epoch-ms of a stored (naive, wall-clock) timestamp, as in the columnar format."""
+    return (ts - _EPOCH) // _MS
+
+
+def encode_columnar(columns: dict[str, np.ndarray], meta: Optional[dict] = None) -> bytes:
+    """
+    Pack equal-length numeric columns into a single little-endian buffer.
+
+    Layout:
+        header   magic "QCOL", u16 version, u16 n_cols, u32 n_rows, u32 meta_len
+        meta     UTF-8 JSON object (e.g. {"symbol": "btcusdt"})
+        schema   per column: u8 name_len, name (UTF-8), 1-byte type code ('d' f64, 'q' i64)
+        padding  zero bytes up to the next 8-byte boundary
+        data     each column's n_rows values, back to back, in schema order
+    """
+    meta_bytes = json.dumps(meta or {}, separators=(",", ":")).encode("utf-8")
+
+    arrays = []
+    schema = bytearray()
+    n_rows = None
+    for name, values in columns.items():
+        values = np.asarray(values)
+        dtype = np.dtype("<i8") if values.dtype.kind in "iumM" else np.dtype("<f8")
+        values = values.astype(dtype, copy=False)
+        if n_rows is None:
+            n_rows = len(values)
+        elif len(values) != n_rows:
+            raise ValueError(f"Column {name!r} has {len(values)} rows, expected {n_rows}")
+
+        name_bytes = name.encode("utf-8")
+        schema += struct.pack("<B", len(name_bytes)) + name_bytes + _CODES[dtype]
+        arrays.append(values)
+
+    head = _HEADER.pack(COLUMNAR_MAGIC, COLUMNAR_VERSION, len(arrays), n_rows or 0, len(meta_bytes))
+    head += meta_bytes + bytes(schema)
+    head += b"\x00" * (-len(head) % 8)
+
+    return head + b"".join(a.tobytes() for a in arrays)
+
+
+def decode_columnar(buf: bytes) -> tuple[dict[str, np.ndarray], dict]:
+    """Inverse of :func:`encode_columnar`. Returns ``(columns, meta)``."""
+    magic, version, n_cols, n_rows, meta_len = _HEADER.unpack_from(buf, 0)
+    if magic != COLUMNAR_MAGIC or version != COLUMNAR_VERSION:
+        raise ValueError("Not a QCOL v1 buffer")
+
+    offset = _HEADER.size
+    meta = json.loads(buf[offset:offset + meta_len].decode("utf-8"))
+    offset += meta_len
+
+    schema = []
+    for _ in range(n_cols):
+        name_len = buf[offset]
+        name = bytes(buf[offset + 1:offset + 1 + name_len]).decode("utf-8")
+        code = bytes(buf[offset + 1 + name_len:offset + 2 + name_len])
+        schema.append((name, _DTYPES[code]))
+        offset += 2 + name_len
+    offset += -offset % 8
+
+    columns = {}
+    for name, dtype in schema:
+        columns[name] = np.frombuffer(buf, dtype=dtype, count=n_rows, offset=offset)
+        offset += n_rows * dtype.itemsize
+    return columns, meta
+
+
+def bar_columns(bars: list[OHLCV]) -> dict[str, np.ndarray]:
+    """
+    Turn OHLCV bars into columns (timestamp as epoch-ms of the stored wall-clock
+    time). Same fields as the JSON bars; a missing vwap is NaN.
+    """
+    return {
+        "timestamp": np.array([epoch_ms(b.timestamp) for b in bars], dtype=np.int64),
+        "open": np.array([b.open for b in bars], dtype=np.float64),
+        "high": np.array([b.high for b in bars], dtype=np.float64),
+        "low": np.array([b.low for b in bars], dtype=np.float64),
+        "close": np.array([b.close for b in bars], dtype=np.float64),
+        "volume": np.array([b.volume for b in bars], dtype=np.float64),
+        "vwap": np.array([np.nan if b.vwap is None else b.vwap for b in bars], dtype=np.float64),
+    }
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, datetime):
+        return epoch_ms(obj)
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def _json_default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def encode_msgpack(payload) -> bytes:
+    """MessagePack-encode a payload; datetimes become epoch-ms integers."""
+    return msgpack.packb(payload, use_bin_type=True, default=_msgpack_default)
+
+
+def encode_json(payload) -> str:
+    """Compact JSON; datetimes become ISO strings."""
+    return json.dumps(payload, separators=(",", ":"), default=_json_default)
+
+
+def encode_frame(message: dict, media_type: str):
+    """Encode a WebSocket message: ``bytes`` for MessagePack, ``str`` for JSON."""
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return encode_msgpack(message)
+    return encode_json(message)
@@ -1,21 +1,31 @@
 import asyncio
 import logging
 import json
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import os
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from fastapi.concurrency import run_in_threadpool
 from fastapi import UploadFile, File, HTTPException
-import pandas as pd
 from io import StringIO
 
 import csv
 from datetime import datetime
-from typing import Set
+from typing import Dict, Optional
 
-from models import Tick
+from models import PairResult, Tick
 from database import TickDatabase
-from analytics import Analytics
+from storage import create_store
+from analytics import Analytics, Microstructure
+from ring_buffer import TickRingBuffer, ticks_to_columns
+from snapshot import capture_state, load_snapshot, write_snapshot
+from pairs import PairScanner
+from retention import RetentionService, load_policies
+from relay import DEFAULT_RELAY_ADDRESS, RelayClient, RelayHub, RelayServer
+from encoding import (
+    COLUMNAR_MEDIA_TYPE, JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE,
+    bar_columns, encode_columnar, encode_frame, encode_msgpack, negotiate,
+)
 from websocket_client import BinanceTickClient
 
 logging.basicConfig(level=logging.INFO)
@@ -34,66 +44,346 @@ app.add_middleware(
 
 # Global state
 db = TickDatabase("ticks.db")
+store = create_store(db)  # $QUANT_STORAGE_BACKEND: sqlite (default) | duckdb
 analytics = Analytics()
 binance_client = None
-connected_clients: Set[WebSocket] = set()
+connected_clients: Dict[WebSocket, str] = {}  # client -> negotiated wire format
 clients_lock = asyncio.Lock()
 
+SYMBOLS = ["btcusdt", "ethusdt", "bnbusdt"]
+MICROSTRUCTURE_WINDOW_SECONDS = 60.0
+MICROSTRUCTURE_PUSH_INTERVAL = 1.0  # seconds between /ws microstructure frames
+microstructure: Dict[str, Microstructure] = {}
+
+BUFFER_CAPACITY = 10000  # Hot ticks kept in memory per symbol
+buffers: Dict[str, TickRingBuffer] = {}
+
+TICK_FLUSH_INTERVAL = 0.05  # seconds; live ticks are stored/applied in micro-batches
+pending_ticks: Dict[str, list[Tick]] = {}  # Received, not yet in the hot state
+unsaved_ticks: list[Tick] = []  # In the hot state, not yet stored
+
+SNAPSHOT_PATH = os.getenv("QUANT_SNAPSHOT_PATH", "analytics_snapshot.npz")
+SNAPSHOT_INTERVAL = 30.0  # seconds
+
+pair_scanner = PairScanner(sample_seconds=1.0, window=600, top_k=20, scan_interval=60.0)
+
+ingested_ticks = 0  # Total live ticks received; paces retention batches
+# Retention is opt-in: nothing is deleted unless $QUANT_RETENTION sets policies,
+# e.g. {"*": {"tick_days": 1, "bar_days": 30}}. Databases created before retention
+# existed are converted to auto_vacuum=INCREMENTAL by one full VACUUM on its first
+# run (writes wait for it); $QUANT_RETENTION_CONVERT=0 skips that, and the file
+# then never shrinks.
+retention = RetentionService(
+    db,
+    policies=load_policies(),
+    ingest_count=lambda: ingested_ticks,
+    convert_vacuum=os.getenv("QUANT_RETENTION_CONVERT", "1") != "0",
+)
+
+# Horizontal scaling. $QUANT_ROLE:
+#   standalone (default) - ingest and serve in one process
+#   ingest               - as standalone, plus publish ticks/analytics on $QUANT_RELAY_ADDRESS
+#   api                  - no Binance feed; mirror state from the ingest node's relay and serve it
+# Addresses: tcp://host:port, unix:///path/to.sock, or inproc://name (same process, for tests)
+ROLE = os.getenv("QUANT_ROLE", "standalone")
+RELAY_ADDRESS = os.getenv("QUANT_RELAY_ADDRESS", DEFAULT_RELAY_ADDRESS)
+relay_hub = RelayHub() if ROLE == "ingest" else None
+relay_server = None
+relay_client = None
+
 @app.on_event("startup")
 async def startup():
-    """Start Binance client and data ingestion."""
-    global binance_client
+    """Restore analytic state, then start Binance client and data ingestion."""
+    global binance_client, relay_server, relay_client
+    
+    logger.info(f"🚀 Starting Quant Analyzer ({ROLE})...")
+    
+    asyncio.create_task(flush_loop())
     
-    logger.info("🚀 Starting Quant Analyzer...")
+    if ROLE == "api":
+        # Stateless: buffers, trackers and pairs are rebuilt from the relay's replay
+        relay_client = RelayClient(RELAY_ADDRESS, on_relay_message, on_relay_gap)
+        asyncio.create_task(relay_client.run())
+        return
+    
+    await warm_start()
+    
+    if relay_hub is not None:
+        relay_server = RelayServer(relay_hub, RELAY_ADDRESS)
+        await relay_server.start()
+        pair_scanner.on_scan = publish_pairs
     
     binance_client = BinanceTickClient(
-        symbols=["btcusdt", "ethusdt", "bnbusdt"],
+        symbols=SYMBOLS,
         on_tick_callback=on_tick
     )
     
     asyncio.create_task(binance_client.start())
+    asyncio.create_task(push_microstructure())
+    asyncio.create_task(snapshot_loop())
+    asyncio.create_task(pair_scanner.run())
+    asyncio.create_task(retention.run())
     logger.info("✅ Binance WebSocket client started")
 
-async def on_tick(tick: Tick):
-    """Called when a new tick arrives from Binance."""
-    # Store in database (non-blocking)
+@app.on_event("shutdown")
+async def shutdown():
+    """Persist analytic state, then flush and release the storage backend."""
+    await flush_ticks()
+    if relay_client is not None:
+        relay_client.stop()
+        await store.close()
+        return
+    if relay_server is not None:
+        await relay_server.close()
     try:
-        await run_in_threadpool(db.insert_tick, tick)
+        write_snapshot(SNAPSHOT_PATH, capture_state(buffers, microstructure, pair_scanner))
     except Exception as e:
-        logger.error(f"Database insert error: {e}")
+        logger.error(f"Snapshot on shutdown failed: {e}")
+    pair_scanner.close()
+    await store.close()
+
+async def warm_start():
+    """
+    Restore ring buffers, microstructure trackers and the pair scanner from the
+    last snapshot, then backfill ticks stored since it was taken. Symbols
+    without a snapshot are cold-started from the newest BUFFER_CAPACITY stored ticks.
+    """
+    restored = load_snapshot(SNAPSHOT_PATH, BUFFER_CAPACITY, pair_scanner)
+    if restored:
+        # Only symbols this node ingests: anything else would be pushed as live
+        buffers.update({s: b for s, b in restored[0].items() if s in SYMBOLS})
+        microstructure.update({s: t for s, t in restored[1].items() if s in SYMBOLS})
+    
+    for symbol in SYMBOLS:
+        buffer = buffers.setdefault(symbol, TickRingBuffer(symbol, BUFFER_CAPACITY))
+
+        # One bounded query covers both cases: a gap larger than the buffer
+        # simply replaces its contents. Ticks in the snapshot's last millisecond
+        # may have been stored after it was taken, so dedupe those by trade id
+        columns = await store.latest_columns(symbol, BUFFER_CAPACITY)
+        unseen = buffer.unseen(columns)
+        columns = {name: values[unseen] for name, values in columns.items()}
+        buffer.extend(columns)
+        backfilled = len(columns["timestamp"])
+        
+        tracker = microstructure.get(symbol)
+        if tracker is None:
+            tracker = microstructure[symbol] = Microstructure(symbol, MICROSTRUCTURE_WINDOW_SECONDS)
+            columns = buffer.latest_columns()
+        tracker.update_columns(columns["timestamp"], columns["price"], columns["size"], columns["side"])
+        
+        logger.info(f"✅ {symbol}: {len(buffer)} ticks warm ({backfilled} backfilled)")
+
+async def snapshot_loop():
+    """Checkpoint hot analytic state every SNAPSHOT_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            # Copy on the loop so live updates can't race the write
+            arrays = capture_state(buffers, microstructure, pair_scanner)
+            await run_in_threadpool(write_snapshot, SNAPSHOT_PATH, arrays)
+        except Exception as e:
+            logger.error(f"Snapshot error: {e}")
+
+async def recent_ticks(symbol: str, limit: int) -> list[Tick]:
+    """Last N ticks, from the in-memory buffer when the symbol is tracked and N fits."""
+    buffer = buffers.get(symbol.lower())
+    if buffer is not None and limit <= buffer.capacity:
+        return buffer.latest_ticks(limit)
+    return await store.latest(symbol.lower(), limit)
+
+async def recent_columns(symbol: str, limit: int) -> dict:
+    """Like recent_ticks, as TickRingBuffer.COLUMNS columns."""
+    buffer = buffers.get(symbol.lower())
+    if buffer is not None and limit <= buffer.capacity:
+        return buffer.latest_columns(limit)
+    return await store.latest_columns(symbol.lower(), limit)
+
+async def on_tick(tick: Tick):
+    """Called when a new tick arrives from Binance."""
+    global ingested_ticks
+    ingested_ticks += 1
+    
+    # Stored and applied to the hot state by the next flush
+    pending_ticks.setdefault(tick.symbol.lower(), []).append(tick)
     
-    # Broadcast to all connected WebSocket clients
-    message = {
+    # Broadcast to all connected WebSocket clients (and relay subscribers).
+    # The timestamp stays a datetime: ISO in JSON, epoch-ms in MessagePack
+    await publish({
         "type": "tick",
         "data": {
             "symbol": tick.symbol.lower(),
-            "timestamp": tick.timestamp.isoformat(),
+            "timestamp": tick.timestamp,
             "price": tick.price,
             "size": tick.size,
+            "side": tick.side,
+            "trade_id": tick.trade_id,
         }
-    }
+    })
+
+def apply_pending():
+    """
+    Fold pending ticks into the hot state, one batch per symbol. Synchronous,
+    so callers can snapshot state that covers every tick published so far.
+    """
+    global pending_ticks
+    if not pending_ticks:
+        return
+    batches, pending_ticks = pending_ticks, {}
+    
+    for symbol, ticks in batches.items():
+        apply_ticks(symbol, ticks)
+        if ROLE != "api":
+            unsaved_ticks.extend(ticks)
+
+async def flush_ticks():
+    """Apply pending live ticks, then store everything not yet saved in one batch."""
+    global unsaved_ticks
+    apply_pending()
+    if not unsaved_ticks:
+        return
+    batch, unsaved_ticks = unsaved_ticks, []
+    try:
+        await store.insert_batch(batch)
+    except Exception as e:
+        logger.error(f"Database insert error: {e}")
+
+async def flush_loop():
+    """Flush pending ticks every TICK_FLUSH_INTERVAL seconds."""
+    while True:
+        await asyncio.sleep(TICK_FLUSH_INTERVAL)
+        try:
+            await flush_ticks()
+        except Exception as e:
+            logger.error(f"Tick flush error: {e}")
+
+def apply_ticks(symbol: str, ticks: list[Tick]):
+    """Update the hot in-memory state (ring buffer, order flow, pair sampler) with one batch."""
+    columns = ticks_to_columns(ticks)
+    buffer = buffers.get(symbol)
+    if buffer is not None:
+        buffer.extend(columns)
+    
+    tracker = microstructure.get(symbol)
+    if tracker is not None:
+        tracker.update_columns(columns["timestamp"], columns["price"], columns["size"], columns["side"])
+    
+    pair_scanner.observe(symbol, ticks[-1].price)
+
+async def on_relay_message(seq: int, message: dict):
+    """API node: mirror a message from the ingest node, then pass it to local clients."""
+    kind = message.get("type")
+    if kind == "tick":
+        tick = Tick(**message["data"])
+        track_symbol(tick.symbol)
+        pending_ticks.setdefault(tick.symbol, []).append(tick)
+        message = {"type": "tick", "data": {**message["data"], "timestamp": tick.timestamp}}
+    elif kind == "microstructure":
+        # CVD is cumulative since the ingest node started, so adopt its value
+        # rather than count from wherever this node joined the replay log. The
+        # frame covers exactly the ticks relayed before it, so apply those first
+        data = message["data"]
+        apply_pending()
+        track_symbol(data["symbol"]).cvd = data["cvd"]
+    elif kind == "pairs":
+        pair_scanner.pairs = [PairResult(**p) for p in message["data"]]
+        return  # Internal to the relay; /ws clients poll /api/pairs
     
+    await broadcast(message)
+
+async def on_relay_gap(last_seq: int, oldest_seq: int):
+    """
+    API node: the relay's replay log no longer covers everything since
+    ``last_seq``. Drop the mirrored buffers and trackers rather than keep a
+    permanent hole in them; the replay that follows rebuilds them from
+    ``oldest_seq`` on, and its next microstructure frame restores CVD.
+    """
+    logger.warning(f"⚠️ Missed relay messages {last_seq + 1}..{oldest_seq - 1}; rebuilding hot state")
+    pending_ticks.clear()
+    buffers.clear()
+    microstructure.clear()
+
+def track_symbol(symbol: str) -> Microstructure:
+    """API node: create a symbol's buffer and tracker on first sight; return the tracker."""
+    if symbol not in buffers:
+        buffers[symbol] = TickRingBuffer(symbol, BUFFER_CAPACITY)
+    if symbol not in microstructure:
+        microstructure[symbol] = Microstructure(symbol, MICROSTRUCTURE_WINDOW_SECONDS)
+    return microstructure[symbol]
+
+def publish_pairs(pairs: list[PairResult]):
+    """Ingest node: share each cointegration scan with the API nodes."""
+    relay_hub.publish({"type": "pairs", "data": [p.model_dump() for p in pairs]})
+
+async def get_microstructure(symbol: str) -> Microstructure:
+    """
+    Return the live tracker for a tracked symbol. Any other symbol gets a
+    one-off tracker over its stored ticks, which is not kept: caching it would
+    make it pushed, snapshotted and restored as if it were live.
+    """
+    symbol = symbol.lower()
+    if symbol in microstructure:
+        return microstructure[symbol]
+    tracker = Microstructure(symbol, MICROSTRUCTURE_WINDOW_SECONDS)
+    columns = await store.latest_columns(symbol, limit=5000)
+    tracker.update_columns(columns["timestamp"], columns["price"], columns["size"], columns["side"])
+    return tracker
+
+async def push_microstructure():
+    """Periodically broadcast order-flow snapshots for every tracked symbol."""
+    while True:
+        await asyncio.sleep(MICROSTRUCTURE_PUSH_INTERVAL)
+        for tracker in list(microstructure.values()):
+            try:
+                # No await between applying and publishing: the frame then
+                # covers every tick relayed before it (API nodes rely on this)
+                apply_pending()
+                await publish({
+                    "type": "microstructure",
+                    "data": tracker.snapshot().model_dump(),
+                })
+            except Exception as e:
+                logger.error(f"Microstructure broadcast error: {e}")
+
+async def publish(message: dict):
+    """Send a message to local /ws clients and, on an ingest node, to relay subscribers."""
+    if relay_hub is not None:
+        relay_hub.publish(message)
+    await broadcast(message)
+
+async def broadcast(message: dict):
+    """Send a message to every connected /ws client in its negotiated format."""
     disconnected = set()
+    frames = {}  # Encode once per wire format, not once per client
     
     async with clients_lock:
-        for client in connected_clients.copy():
+        for client, media_type in list(connected_clients.items()):
             try:
-                await client.send_json(message)
+                if media_type not in frames:
+                    frames[media_type] = encode_frame(message, media_type)
+                frame = frames[media_type]
+                if isinstance(frame, bytes):
+                    await client.send_bytes(frame)
+                else:
+                    await client.send_text(frame)
             except Exception as e:
                 logger.warning(f"Failed to send to client: {e}")
                 disconnected.add(client)
         
         # Remove disconnected clients
         for client in disconnected:
-            connected_clients.discard(client)
+            connected_clients.pop(client, None)
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time tick streaming."""
+async def websocket_endpoint(websocket: WebSocket, format: Optional[str] = None):
+    """WebSocket endpoint for real-time tick streaming. Pass ?format=msgpack for binary frames."""
+    media_type = negotiate(None, format)
+    if media_type == COLUMNAR_MEDIA_TYPE:
+        media_type = JSON_MEDIA_TYPE  # Columnar is for history loads, not single-tick frames
     try:
         await websocket.accept()
         async with clients_lock:
-            connected_clients.add(websocket)
+            connected_clients[websocket] = media_type
         logger.info(f"✅ WebSocket connected. Total clients: {len(connected_clients)}")
         
         # Keep connection alive
@@ -104,7 +394,11 @@ async def websocket_endpoint(websocket: WebSocket):
             except asyncio.TimeoutError:
                 # Send ping to keep connection alive
                 try:
-                    await websocket.send_json({"type": "ping"})
+                    frame = encode_frame({"type": "ping"}, media_type)
+                    if isinstance(frame, bytes):
+                        await websocket.send_bytes(frame)
+                    else:
+                        await websocket.send_text(frame)
                 except:
                     break
             except:
@@ -112,60 +406,143 @@ async def websocket_endpoint(websocket: WebSocket):
                 
     except WebSocketDisconnect:
         async with clients_lock:
-            connected_clients.discard(websocket)
+            connected_clients.pop(websocket, None)
         logger.info(f"❌ WebSocket disconnected. Remaining clients: {len(connected_clients)}")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         async with clients_lock:
-            connected_clients.discard(websocket)
+            connected_clients.pop(websocket, None)
 
 @app.get("/api/ticks/{symbol}")
-def get_ticks(symbol: str, limit: int = 100):
-    """Fetch recent ticks for a symbol."""
+async def get_ticks(request: Request, symbol: str, limit: int = 100, format: Optional[str] = None):
+    """
+    Fetch recent ticks for a symbol.
+
+    JSON by default. Send ``Accept: application/vnd.quant.columnar`` (or
+    ``?format=columnar``) for packed little-endian columns, or
+    ``application/x-msgpack`` for MessagePack rows.
+    """
+    media_type = negotiate(request.headers.get("accept"), format)
     try:
-        ticks = db.get_ticks(symbol.lower(), limit)
+        # Hot buffer first: no SQLite read for the common recent-ticks request
+        if media_type == COLUMNAR_MEDIA_TYPE:
+            columns = await recent_columns(symbol, limit)
+            body = encode_columnar(columns, {"symbol": symbol.lower()})
+            return Response(content=body, media_type=media_type)
         
-        if not ticks:
-            return []
+        ticks = await recent_ticks(symbol, limit)
         
-        return [
+        rows = [
             {
                 "symbol": t.symbol,
-                "timestamp": t.timestamp.isoformat(),
+                "timestamp": t.timestamp,
                 "price": t.price,
                 "size": t.size,
+                "side": t.side,
+                "trade_id": t.trade_id,
             }
             for t in ticks
         ]
+        if media_type == MSGPACK_MEDIA_TYPE:
+            return Response(content=encode_msgpack(rows), media_type=media_type)
+        return rows
     except Exception as e:
         logger.error(f"Error fetching ticks: {e}")
         return []
 
+@app.get("/api/bars/{symbol}")
+async def get_bars(request: Request, symbol: str, interval: int = 60, limit: int = 10000,
+                   start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   format: Optional[str] = None):
+    """
+    OHLCV + VWAP bars over [start, end] (open-ended if omitted), at most the
+    last ``limit`` bars. Same content negotiation as /api/ticks. 400 if the
+    range reaches compacted history and ``interval`` isn't a multiple of its 60s.
+    """
+    media_type = negotiate(request.headers.get("accept"), format)
+    try:
+        bars = await store.aggregate_bars(symbol.lower(), interval, start, end)
+        bars = bars[-limit:]
+        
+        if media_type == COLUMNAR_MEDIA_TYPE:
+            body = encode_columnar(bar_columns(bars), {"symbol": symbol.lower(), "interval": interval})
+            return Response(content=body, media_type=media_type)
+        
+        rows = [
+            {
+                "symbol": b.symbol,
+                "timestamp": b.timestamp,
+                "open": b.open,
+                "high": b.high,
+                "low": b.low,
+                "close": b.close,
+                "volume": b.volume,
+                "vwap": b.vwap,
+            }
+            for b in bars
+        ]
+        if media_type == MSGPACK_MEDIA_TYPE:
+            return Response(content=encode_msgpack(rows), media_type=media_type)
+        return rows
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))  # Interval compacted history can't serve
+    except Exception as e:
+        logger.error(f"Error computing bars: {e}")
+        return []
+
 @app.get("/api/analytics/{symbol}")
-def get_analytics(symbol: str):
+async def get_analytics(symbol: str):
     """Compute and return analytics for a symbol."""
     try:
-        ticks = db.get_ticks(symbol.lower(), limit=500)
+        ticks = await recent_ticks(symbol, limit=500)
         
         if not ticks:
             return {"symbol": symbol, "error": "No ticks found"}
         
+        # ADF is CPU-heavy; keep it off the event loop
+        adf_pvalue = await run_in_threadpool(analytics.compute_adf_test, ticks)
         return {
             "symbol": symbol,
             "zscore": analytics.compute_zscore(ticks, window=20),
             "spread": analytics.compute_spread(ticks, window=20),
-            "adf_pvalue": analytics.compute_adf_test(ticks),
+            "adf_pvalue": adf_pvalue,
         }
     except Exception as e:
         logger.error(f"Error computing analytics: {e}")
         return {"symbol": symbol, "error": str(e)}
 
+@app.get("/api/microstructure/{symbol}")
+async def get_microstructure_snapshot(symbol: str):
+    """Rolling order-flow imbalance, CVD, VWAP, trade intensity and realized volatility."""
+    try:
+        tracker = await get_microstructure(symbol)
+        return tracker.snapshot().model_dump()
+    except Exception as e:
+        logger.error(f"Error computing microstructure: {e}")
+        return {"symbol": symbol, "error": str(e)}
+
+@app.get("/api/pairs")
+def get_pairs(limit: int = 20):
+    """Ranked pairs from the latest cointegration scan (most cointegrated first)."""
+    return {
+        "symbols": len(pair_scanner.symbols),
+        "pairs": [p.model_dump() for p in pair_scanner.pairs[:limit]],
+    }
+
+@app.get("/api/retention")
+def get_retention():
+    """Retention policies plus progress and reclaimed-space metrics."""
+    return {
+        "policies": {symbol: p.model_dump() for symbol, p in retention.policies.items()},
+        "stats": retention.stats.model_dump(),
+    }
+
 @app.get("/api/correlation/{symbol1}/{symbol2}")
-def get_correlation(symbol1: str, symbol2: str):
+async def get_correlation(symbol1: str, symbol2: str):
     """Correlation and hedge ratio between two symbols."""
     try:
-        ticks1 = db.get_ticks(symbol1.lower(), limit=500)
-        ticks2 = db.get_ticks(symbol2.lower(), limit=500)
+        ticks1 = await recent_ticks(symbol1, limit=500)
+        ticks2 = await recent_ticks(symbol2, limit=500)
         
         if not ticks1 or not ticks2:
             return {"symbol1": symbol1, "symbol2": symbol2, "error": "Insufficient data"}
@@ -184,38 +561,43 @@ def get_correlation(symbol1: str, symbol2: str):
         return {"symbol1": symbol1, "symbol2": symbol2, "error": str(e)}
 
 @app.get("/api/export/{symbol}")
-def export_csv(symbol: str):
+async def export_csv(symbol: str):
     """Export ticks as CSV file."""
     try:
-        ticks = db.get_ticks(symbol.lower(), limit=10000)
+        ticks = await store.latest(symbol.lower(), limit=10000)
         
         if not ticks:
             return {"error": "No data to export"}
         
         filename = f"ticks_{symbol}_{datetime.now().isoformat().replace(':', '-')}.csv"
-        
-        with open(filename, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(["symbol", "timestamp", "price", "size"])
-            for tick in ticks:
-                writer.writerow([
-                    tick.symbol,
-                    tick.timestamp.isoformat(),
-                    tick.price,
-                    tick.size
-                ])
+        await run_in_threadpool(_write_csv, filename, ticks)
         
         return FileResponse(filename, filename=filename)
     except Exception as e:
         logger.error(f"Error exporting: {e}")
         return {"error": str(e)}
 
+def _write_csv(filename: str, ticks: list[Tick]) -> None:
+    with open(filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["symbol", "timestamp", "price", "size"])
+        for tick in ticks:
+            writer.writerow([
+                tick.symbol,
+                tick.timestamp.isoformat(),
+                tick.price,
+                tick.size
+            ])
+
 @app.get("/api/health")
 def health():
     """Health check endpoint."""
     return {
         "status": "healthy",
+        "role": ROLE,
         "ws_clients": len(connected_clients),
+        "relay_seq": relay_hub.seq if relay_hub else (relay_client.last_seq if relay_client else None),
+        "relay_subscribers": relay_hub.subscriber_count if relay_hub else None,
         "timestamp": datetime.now().isoformat()
     }
 
@@ -269,6 +651,8 @@ async def upload_ohlc(symbol: str, file: UploadFile = File(...)):
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="Only CSV files supported")
 
+    import pandas as pd  # Deferred: only needed for uploads
+    
     try:
         content = (await file.read()).decode("utf-8")
         df = pd.read_csv(StringIO(content))
@@ -277,16 +661,16 @@ async def upload_ohlc(symbol: str, file: UploadFile = File(...)):
             raise HTTPException(status_code=400,
                                 detail=f"CSV must contain columns: {', '.join(required)}")
 
-        inserted = 0
-        for _, row in df.iterrows():
-            tick = Tick(
+        ticks = [
+            Tick(
                 symbol=symbol.lower(),
-                timestamp=datetime.fromisoformat(str(row["time"])),
-                price=float(row["close"]),
-                size=float(row.get("volume", 0.0)),
+                timestamp=datetime.fromisoformat(str(t)),
+                price=float(close),
+                size=float(volume),
             )
-            db.insert_tick(tick)
-            inserted += 1
+            for t, close, volume in zip(df["time"], df["close"], df["volume"])
+        ]
+        inserted = await store.insert_batch(ticks)
 
         return {"status": "ok", "inserted": inserted}
     except HTTPException:
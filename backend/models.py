@@ -2,12 +2,18 @@ from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
 
+# Aggressor side -> sign used in numeric/columnar order-flow data (0 = unknown)
+SIDE_SIGN = {"buy": 1, "sell": -1}
+NO_TRADE_ID = -1  # trade_id in int64 tick columns when the tick has none
+
 class Tick(BaseModel):
     """Represents a single trade tick from Binance."""
     symbol: str
     timestamp: datetime
     price: float
     size: float
+    side: Optional[str] = None  # Aggressor side: "buy" or "sell" (from Binance buyer-maker flag)
+    trade_id: Optional[int] = None
     
     class Config:
         json_encoders = {
@@ -23,6 +29,11 @@ class OHLCV(BaseModel):
     low: float
     close: float
     volume: float
+    vwap: Optional[float] = None
+    # Times of the bar's first/last trade, when known; let bars built from
+    # different tick sets be merged with the right open/close
+    first_trade_at: Optional[datetime] = None
+    last_trade_at: Optional[datetime] = None
 
 class AnalyticsResult(BaseModel):
     """Analytics computation result."""
@@ -35,6 +46,19 @@ class AnalyticsResult(BaseModel):
     high: Optional[float] = None
     low: Optional[float] = None
 
+class MicrostructureResult(BaseModel):
+    """Rolling order-flow / microstructure metrics."""
+    symbol: str
+    window_seconds: float
+    buy_volume: float = 0.0
+    sell_volume: float = 0.0
+    imbalance: Optional[float] = None
+    cvd: float = 0.0
+    vwap: Optional[float] = None
+    trade_intensity: Optional[float] = None
+    realized_volatility: Optional[float] = None
+    tick_count: int = 0
+
 class CorrelationResult(BaseModel):
     """Correlation and hedge ratio result."""
     symbol1: str
@@ -42,6 +66,35 @@ class CorrelationResult(BaseModel):
     correlation: Optional[float] = None
     hedge_ratio: Optional[float] = None
 
+class PairResult(BaseModel):
+    """Cointegration scan result for one symbol pair."""
+    symbol1: str
+    symbol2: str
+    correlation: float
+    hedge_ratio: Optional[float] = None
+    adf_stat: Optional[float] = None
+    pvalue: Optional[float] = None
+    half_life_seconds: Optional[float] = None
+
+class RetentionPolicy(BaseModel):
+    """How long to keep a symbol's raw ticks and rolled-up bars."""
+    tick_days: float = 1.0
+    bar_days: float = 30.0
+
+class RetentionStats(BaseModel):
+    """Progress and reclaimed-space counters for the retention service."""
+    runs: int = 0
+    running: bool = False
+    current_symbol: Optional[str] = None
+    ticks_deleted: int = 0
+    bars_upserted: int = 0
+    bars_deleted: int = 0
+    bytes_reclaimed: int = 0
+    last_run_started: Optional[str] = None
+    last_run_seconds: Optional[float] = None
+    db_bytes: Optional[int] = None
+    free_bytes: Optional[int] = None
+
 class HealthCheck(BaseModel):
     """Health check response."""
     status: str
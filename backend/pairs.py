@@ -0,0 +1,258 @@
+import asyncio
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+
+from analytics import Analytics
+from models import PairResult
+
+logger = logging.getLogger(__name__)
+
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """
+    Start method for scan workers. Never fork: the server already runs
+    SQLite/DuckDB/threadpool threads, and a forked child can inherit a lock one
+    of them held. forkserver is POSIX-only; spawn everywhere else (Windows).
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["analytics"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+class PairScanner:
+    """
+    Universe-wide rolling correlation matrix plus a periodic cointegration scan.
+
+    Ticks only record each symbol's latest price (O(1)). Once per
+    ``sample_seconds`` every symbol's log price is sampled onto a common clock
+    and the return cross-product sums are updated by a rank-1 add/remove,
+    O(N^2) per sample instead of O(window * N^2) per tick. Every
+    ``scan_interval`` the ``top_k`` most correlated pairs are tested for
+    Engle-Granger cointegration in a process pool and published as ``pairs``
+    (and passed to ``on_scan``, if set).
+    """
+
+    def __init__(self, sample_seconds: float = 1.0, window: int = 600,
+                 top_k: int = 20, scan_interval: float = 60.0, workers: Optional[int] = None,
+                 on_scan: Optional[Callable[[list[PairResult]], None]] = None):
+        self.sample_seconds = sample_seconds
+        self.window = window
+        self.top_k = top_k
+        self.scan_interval = scan_interval
+        self.workers = workers
+        self.on_scan = on_scan
+
+        self.symbols: list[str] = []
+        self._index: dict[str, int] = {}
+        self._latest = np.zeros(0)       # Latest observed price per symbol
+        self._prev_log = np.zeros(0)     # Log price at the previous sample
+        self._added_at = np.zeros(0, dtype=np.int64)  # Sample step each symbol joined
+        self._resync = np.zeros(0, dtype=bool)  # Restored: re-anchor prev_log on next price
+
+        self._returns = np.zeros((window, 0))    # Ring of sampled log returns
+        self._log_prices = np.zeros((window, 0))  # Ring of sampled log prices
+        self._sum = np.zeros(0)
+        self._cross = np.zeros((0, 0))
+        self._steps = 0
+
+        self.pairs: list[PairResult] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._scan_task: Optional[asyncio.Task] = None
+
+    def observe(self, symbol: str, price: float) -> None:
+        """Record the latest trade price for a symbol."""
+        i = self._index.get(symbol)
+        if i is None:
+            i = self._add_symbol(symbol, price)
+        elif self._resync[i]:
+            # First price since a restore: don't book the downtime move as one return
+            self._prev_log[i] = np.log(price)
+            self._resync[i] = False
+        self._latest[i] = price
+
+    def _add_symbol(self, symbol: str, price: float) -> int:
+        """Grow every per-symbol array by one column (rare, so a copy is fine)."""
+        i = len(self.symbols)
+        self.symbols.append(symbol)
+        self._index[symbol] = i
+
+        self._latest = np.append(self._latest, price)
+        self._prev_log = np.append(self._prev_log, np.log(price))
+        self._added_at = np.append(self._added_at, self._steps)
+        self._resync = np.append(self._resync, False)
+        self._returns = np.pad(self._returns, ((0, 0), (0, 1)))
+        self._log_prices = np.pad(self._log_prices, ((0, 0), (0, 1)), constant_values=np.log(price))
+        self._sum = np.append(self._sum, 0.0)
+        self._cross = np.pad(self._cross, ((0, 1), (0, 1)))
+        return i
+
+    def sample(self) -> None:
+        """Take one sample of every symbol's price and update the rolling sums."""
+        if not self.symbols:
+            return
+
+        log_price = np.log(self._latest)
+        r = log_price - self._prev_log
+        slot = self._steps % self.window
+
+        if self._steps >= self.window:
+            old = self._returns[slot]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        self._sum += r
+        self._cross += np.outer(r, r)
+
+        self._returns[slot] = r
+        self._log_prices[slot] = log_price
+        self._prev_log = log_price
+        self._steps += 1
+
+        if self._steps % self.window == 0:
+            # Recompute exactly once per window so float drift never accumulates
+            self._sum = self._returns.sum(axis=0)
+            self._cross = self._returns.T @ self._returns
+
+    def state(self) -> dict[str, np.ndarray]:
+        """Rolling sample state and the latest pair table as arrays, for snapshots."""
+        return {
+            "symbols": np.array(self.symbols, dtype=str),
+            "sample_seconds": np.array(self.sample_seconds),
+            "latest": self._latest,
+            "prev_log": self._prev_log,
+            "added_at": self._added_at,
+            "returns": self._returns,
+            "log_prices": self._log_prices,
+            "steps": np.array(self._steps),
+            "table": np.array(json.dumps([p.model_dump() for p in self.pairs])),
+        }
+
+    def restore(self, state: dict[str, np.ndarray]) -> bool:
+        """
+        Load state captured by :meth:`state`. Returns False (leaving the scanner
+        empty) if it was taken with a different window or sampling period.
+        Each symbol's next return starts from its first price after the restore.
+        """
+        if state["returns"].shape[0] != self.window or float(state["sample_seconds"]) != self.sample_seconds:
+            return False
+
+        self.symbols = [str(s) for s in state["symbols"]]
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._latest = state["latest"].astype(np.float64)
+        self._prev_log = state["prev_log"].astype(np.float64)
+        self._added_at = state["added_at"].astype(np.int64)
+        self._resync = np.ones(len(self.symbols), dtype=bool)
+        self._returns = state["returns"].reshape(self.window, len(self.symbols)).astype(np.float64)
+        self._log_prices = state["log_prices"].reshape(self.window, len(self.symbols)).astype(np.float64)
+        self._steps = int(state["steps"])
+        self._sum = self._returns.sum(axis=0)
+        self._cross = self._returns.T @ self._returns
+        self.pairs = [PairResult(**p) for p in json.loads(str(state["table"]))]
+        return True
+
+    def _ready(self) -> np.ndarray:
+        """Mask of symbols with a full window of samples."""
+        return self._steps - self._added_at >= self.window
+
+    def correlation_matrix(self) -> np.ndarray:
+        """Current N x N return correlation matrix (NaN for flat or immature symbols)."""
+        n = min(self._steps, self.window)
+        if n < 2:
+            return np.full((len(self.symbols), len(self.symbols)), np.nan)
+
+        mean = self._sum / n
+        cov = self._cross / n - np.outer(mean, mean)
+        std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(std, std)
+        corr[std < 1e-12, :] = np.nan
+        corr[:, std < 1e-12] = np.nan
+        corr[~self._ready(), :] = np.nan
+        corr[:, ~self._ready()] = np.nan
+        return corr
+
+    def top_pairs(self, k: int) -> list[tuple[int, int, float]]:
+        """The k most correlated (by |rho|) distinct pairs as (i, j, rho)."""
+        corr = self.correlation_matrix()
+        rows, cols = np.triu_indices(len(self.symbols), k=1)
+        values = corr[rows, cols]
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid) == 0:
+            return []
+
+        k = min(k, len(valid))
+        best = valid[np.argpartition(-np.abs(values[valid]), k - 1)[:k]]
+        return [(int(rows[b]), int(cols[b]), float(values[b])) for b in best]
+
+    def _ordered_log_prices(self) -> np.ndarray:
+        """Log price ring in chronological order (window x N)."""
+        slot = self._steps % self.window
+        return np.roll(self._log_prices, -slot, axis=0)
+
+    async def scan(self) -> list[PairResult]:
+        """Run Engle-Granger on the top-K correlated pairs and publish the ranked table."""
+        candidates = self.top_pairs(self.top_k)
+        if not candidates:
+            return self.pairs
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+
+        prices = self._ordered_log_prices()
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(self._pool, Analytics.compute_engle_granger,
+                                 prices[:, i].copy(), prices[:, j].copy())
+            for i, j, _ in candidates
+        ))
+
+        pairs = []
+        for (i, j, rho), eg in zip(candidates, results):
+            eg = eg or {}
+            half_life = eg.get("half_life")
+            pairs.append(PairResult(
+                symbol1=self.symbols[i],
+                symbol2=self.symbols[j],
+                correlation=rho,
+                hedge_ratio=eg.get("hedge_ratio"),
+                adf_stat=eg.get("adf_stat"),
+                pvalue=eg.get("pvalue"),
+                half_life_seconds=None if half_life is None else half_life * self.sample_seconds,
+            ))
+
+        # Most cointegrated first; untestable pairs last, by correlation
+        pairs.sort(key=lambda p: (p.pvalue is None, p.pvalue if p.pvalue is not None else -abs(p.correlation)))
+        self.pairs = pairs
+        return pairs
+
+    async def run(self) -> None:
+        """Sample on a fixed clock and scan on schedule until cancelled."""
+        samples_per_scan = max(1, int(self.scan_interval / self.sample_seconds))
+        while True:
+            await asyncio.sleep(self.sample_seconds)
+            self.sample()
+            # Scan in the background so sampling keeps its clock; skip if one is still running
+            scan_due = self._steps % samples_per_scan == 0
+            if scan_due and (self._scan_task is None or self._scan_task.done()):
+                self._scan_task = asyncio.create_task(self._scan_logged())
+
+    async def _scan_logged(self) -> None:
+        try:
+            await self.scan()
+            logger.info(f"✅ Pair scan: {len(self.pairs)} pairs over {len(self.symbols)} symbols")
+            if self.on_scan is not None:
+                self.on_scan(self.pairs)
+        except Exception as e:
+            logger.error(f"Pair scan error: {e}")
+
+    def close(self) -> None:
+        """Stop the worker pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
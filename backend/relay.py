@@ -0,0 +1,267 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from encoding import encode_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RELAY_ADDRESS = "tcp://127.0.0.1:8765"
+
+# inproc://name -> hub, so tests and single-process setups can skip sockets
+_INPROC_HUBS: dict[str, "RelayHub"] = {}
+
+
+class Subscription:
+    """One subscriber: messages it missed (backlog) plus a queue of live ones."""
+
+    def __init__(self, backlog: list[tuple[int, bytes]], oldest_seq: int, max_pending: int):
+        self.backlog = backlog
+        self.oldest_seq = oldest_seq  # Oldest replayable seq when it subscribed
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+
+class RelayHub:
+    """
+    Broker core: numbers published messages, keeps a bounded replay log and
+    fans each message out to subscriber queues.
+
+    Messages are encoded once at publish time and the same bytes go to every
+    subscriber. ``epoch`` changes whenever the publishing process restarts, so
+    subscribers know their last sequence number no longer applies.
+    """
+
+    def __init__(self, replay_size: int = 100000, max_pending: int = 10000):
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        self.max_pending = max_pending
+        self._log: deque[tuple[int, bytes]] = deque(maxlen=replay_size)
+        self._subscribers: set[Subscription] = set()
+
+    @property
+    def oldest_seq(self) -> int:
+        """Oldest sequence number still replayable (seq + 1 if the log is empty)."""
+        return self._log[0][0] if self._log else self.seq + 1
+
+    def publish(self, message: dict) -> int:
+        """Append a message to the log and queue it for every subscriber."""
+        self.seq += 1
+        line = encode_json({"seq": self.seq, "msg": message}).encode("utf-8") + b"\n"
+        self._log.append((self.seq, line))
+
+        for sub in list(self._subscribers):
+            try:
+                sub.queue.put_nowait((self.seq, line))
+            except asyncio.QueueFull:
+                # Too slow to keep up: cut it loose; it reconnects and replays
+                sub.overflowed = True
+                self._subscribers.discard(sub)
+        return self.seq
+
+    def subscribe(self, from_seq: int = 0, epoch: Optional[str] = None) -> Subscription:
+        """
+        Register a subscriber that has seen everything up to ``from_seq``.
+
+        Backlog capture and registration happen with no await in between, so
+        nothing published concurrently is missed or delivered twice.
+        """
+        if epoch != self.epoch:
+            from_seq = 0  # Publisher restarted: old sequence numbers are meaningless
+        if from_seq + 1 < self.oldest_seq and from_seq > 0:
+            logger.warning(f"⚠️ Relay subscriber gap: wants {from_seq + 1}, oldest is {self.oldest_seq}")
+
+        sub = Subscription([entry for entry in self._log if entry[0] > from_seq], self.oldest_seq, self.max_pending)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        self._subscribers.discard(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+class RelayServer:
+    """
+    Serves a RelayHub over TCP (``tcp://host:port``) or a Unix socket
+    (``unix:///path``), as newline-delimited JSON.
+
+    Protocol: the client sends ``{"epoch": ..., "from_seq": n}``; the server
+    answers ``{"epoch": ..., "oldest_seq": m}`` and then streams
+    ``{"seq": n, "msg": {...}}`` lines, replaying its log first. ``oldest_seq``
+    tells the client whether its replay is complete.
+    """
+
+    def __init__(self, hub: RelayHub, address: str = DEFAULT_RELAY_ADDRESS):
+        self.hub = hub
+        self.address = address
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        scheme, _, target = self.address.partition("://")
+        if scheme == "tcp":
+            host, _, port = target.rpartition(":")
+            self._server = await asyncio.start_server(self._handle, host, int(port))
+        elif scheme == "unix":
+            if os.path.exists(target):
+                os.unlink(target)
+            self._server = await asyncio.start_unix_server(self._handle, target)
+        elif scheme == "inproc":
+            _INPROC_HUBS[target] = self.hub
+        else:
+            raise ValueError(f"Unsupported relay address {self.address!r}")
+        logger.info(f"✅ Relay publishing on {self.address}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        sub = None
+        self._handlers.add(asyncio.current_task())
+        try:
+            request = json.loads(await reader.readline() or b"{}")
+            sub = self.hub.subscribe(int(request.get("from_seq", 0)), request.get("epoch"))
+            writer.write(json.dumps({"epoch": self.hub.epoch, "oldest_seq": sub.oldest_seq}).encode("utf-8") + b"\n")
+
+            for _, line in sub.backlog:
+                writer.write(line)
+                await writer.drain()
+            sub.backlog = []
+
+            while not sub.overflowed:
+                _, line = await sub.queue.get()
+                writer.write(line)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass  # Server closing
+        except Exception as e:
+            logger.error(f"Relay subscriber error: {e}")
+        finally:
+            if sub is not None:
+                self.hub.unsubscribe(sub)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._handlers):
+                task.cancel()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+        scheme, _, target = self.address.partition("://")
+        if scheme == "inproc":
+            _INPROC_HUBS.pop(target, None)
+
+
+class RelayClient:
+    """
+    Subscribes to a RelayServer and hands each message to ``on_message``.
+
+    Tracks the last sequence number it delivered and, on reconnect, asks for
+    everything after it, so a node that drops out catches up from the
+    publisher's replay log instead of silently missing ticks. If the log no
+    longer reaches back that far, ``on_gap(last_seq, oldest_seq)`` is awaited
+    before the replay, so the node can discard state that now has a hole.
+    """
+
+    def __init__(self, address: str, on_message: Callable[[int, dict], Awaitable[None]],
+                 on_gap: Optional[Callable[[int, int], Awaitable[None]]] = None):
+        self.address = address
+        self.on_message = on_message
+        self.on_gap = on_gap
+        self.epoch: Optional[str] = None
+        self.last_seq = 0
+        self.running = True
+        self._retry = 0
+
+    async def run(self) -> None:
+        """Connect, replay, stream; reconnect with exponential backoff until stopped."""
+        while self.running:
+            try:
+                await self._stream()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self._retry += 1
+                wait_time = min(2 ** self._retry, 30)
+                logger.error(f"Relay connection error: {e}; retrying in {wait_time}s")
+                await asyncio.sleep(wait_time)
+
+    async def _stream(self) -> None:
+        scheme, _, target = self.address.partition("://")
+        if scheme == "inproc":
+            await self._stream_inproc(target)
+            return
+        if scheme == "tcp":
+            host, _, port = target.rpartition(":")
+            reader, writer = await asyncio.open_connection(host, int(port))
+        elif scheme == "unix":
+            reader, writer = await asyncio.open_unix_connection(target)
+        else:
+            raise ValueError(f"Unsupported relay address {self.address!r}")
+
+        try:
+            writer.write(json.dumps({"epoch": self.epoch, "from_seq": self.last_seq}).encode("utf-8") + b"\n")
+            await writer.drain()
+            handshake = json.loads(await reader.readline())
+            await self._start_replay(handshake["epoch"], handshake.get("oldest_seq", 0))
+            self._retry = 0  # Handshake done: the next drop starts backoff afresh
+            logger.info(f"✅ Relay subscribed to {self.address} from seq {self.last_seq}")
+
+            while self.running:
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionError("relay closed the connection")
+                frame = json.loads(line)
+                await self._deliver(frame["seq"], frame["msg"])
+        finally:
+            writer.close()
+
+    async def _stream_inproc(self, name: str) -> None:
+        hub = _INPROC_HUBS.get(name)
+        if hub is None:
+            raise ConnectionError(f"no in-process relay named {name!r}")
+
+        sub = hub.subscribe(self.last_seq, self.epoch)
+        self._retry = 0
+        try:
+            await self._start_replay(hub.epoch, sub.oldest_seq)
+            for seq, line in sub.backlog:
+                await self._deliver(seq, json.loads(line)["msg"])
+            sub.backlog = []
+            while self.running and not sub.overflowed:
+                seq, line = await sub.queue.get()
+                await self._deliver(seq, json.loads(line)["msg"])
+        finally:
+            hub.unsubscribe(sub)
+        if sub.overflowed:
+            raise ConnectionError("fell behind the in-process relay")
+
+    async def _start_replay(self, epoch: str, oldest_seq: int) -> None:
+        """Adopt the publisher's epoch and report messages its replay log no longer has."""
+        subscribed_before = self.epoch is not None
+        if epoch != self.epoch:
+            if subscribed_before:
+                logger.warning("⚠️ Relay publisher restarted; replaying its full log")
+            self.epoch = epoch
+            self.last_seq = 0
+        if subscribed_before and self.last_seq + 1 < oldest_seq:
+            logger.warning(f"⚠️ Relay replay gap: seq {self.last_seq + 1}..{oldest_seq - 1} are gone")
+            if self.on_gap is not None:
+                await self.on_gap(self.last_seq, oldest_seq)
+
+    async def _deliver(self, seq: int, message: dict) -> None:
+        if seq <= self.last_seq:
+            return  # Already delivered before a reconnect
+        await self.on_message(seq, message)
+        self.last_seq = seq
+
+    def stop(self) -> None:
+        self.running = False
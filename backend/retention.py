@@ -0,0 +1,181 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from database import TickDatabase
+from models import RetentionPolicy, RetentionStats
+
+logger = logging.getLogger(__name__)
+
+
+def load_policies(raw: Optional[str] = None) -> dict[str, RetentionPolicy]:
+    """
+    Parse per-symbol policies from JSON (default: $QUANT_RETENTION), e.g.
+    ``{"*": {"tick_days": 1, "bar_days": 30}, "btcusdt": {"tick_days": 7}}``.
+    ``"*"`` is the default for symbols without their own entry. Retention is
+    opt-in: with no policies nothing is ever deleted, and without ``"*"`` only
+    the listed symbols are.
+    """
+    raw = raw if raw is not None else os.getenv("QUANT_RETENTION", "")
+    policies = {}
+    if raw:
+        for symbol, policy in json.loads(raw).items():
+            policies[symbol.lower()] = RetentionPolicy(**policy)
+    return policies
+
+
+class RetentionService:
+    """
+    Background retention: rolls expired raw ticks into bars, deletes them and
+    old bars in small indexed batches, then hands freed pages back to the OS.
+
+    Each batch is its own short transaction, so inserts interleave with it. The
+    pause between batches grows with the current ingestion rate, so cleanup
+    backs off while the feed is busy.
+    """
+
+    def __init__(self, db: TickDatabase, policies: dict[str, RetentionPolicy],
+                 ingest_count: Callable[[], int], interval: float = 600.0,
+                 batch_size: int = 2000, base_pause: float = 0.05,
+                 vacuum_pages: int = 1000, convert_vacuum: bool = True):
+        """
+        Args:
+            db: Database to maintain
+            policies: Per-symbol policies, with "*" as the default
+            ingest_count: Returns the total ticks ingested so far (used for pacing)
+            interval: Seconds between retention runs
+            batch_size: Rows per delete transaction
+            base_pause: Pause between batches (seconds) when ingestion is idle
+            vacuum_pages: Pages released per incremental-vacuum step
+            convert_vacuum: If the file predates auto_vacuum=INCREMENTAL, convert
+                it with one full VACUUM on the first run (writers wait for it).
+                Without this such a file never shrinks.
+        """
+        self.db = db
+        self.policies = policies
+        self.ingest_count = ingest_count
+        self.interval = interval
+        self.batch_size = batch_size
+        self.base_pause = base_pause
+        self.vacuum_pages = vacuum_pages
+        self.convert_vacuum = convert_vacuum
+        self.stats = RetentionStats()
+        self._last_count = ingest_count()
+        self._last_count_at = time.monotonic()
+
+    def policy_for(self, symbol: str) -> Optional[RetentionPolicy]:
+        """The symbol's policy, else the "*" default; None if it has neither (kept forever)."""
+        return self.policies.get(symbol, self.policies.get("*"))
+
+    def _ingest_rate(self) -> float:
+        """Ticks/sec ingested since the previous call."""
+        now = time.monotonic()
+        count = self.ingest_count()
+        rate = (count - self._last_count) / max(now - self._last_count_at, 1e-3)
+        self._last_count, self._last_count_at = count, now
+        return rate
+
+    async def _pause(self) -> None:
+        """Yield between batches: ~base_pause when idle, ~+1s per 1000 ticks/sec."""
+        await asyncio.sleep(self.base_pause + self._ingest_rate() / 1000.0)
+
+    async def _call(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, fn, *args)
+
+    async def run_once(self) -> RetentionStats:
+        """One full pass over every stored symbol."""
+        stats = self.stats
+        started = time.monotonic()
+        stats.running = True
+        stats.last_run_started = datetime.now().isoformat()
+        before = await self._call(self.db.storage_stats)
+
+        try:
+            for symbol in await self._call(self.db.get_symbols):
+                policy = self.policy_for(symbol)
+                if policy is None:
+                    continue
+                stats.current_symbol = symbol
+
+                # Raw ticks: rolled up into bars, then deleted (created_at is UTC)
+                tick_cutoff = (datetime.utcnow() - timedelta(days=policy.tick_days)).strftime("%Y-%m-%d %H:%M:%S")
+                while True:
+                    deleted, upserted = await self._call(
+                        self.db.compact_ticks, symbol, tick_cutoff, self.batch_size
+                    )
+                    stats.ticks_deleted += deleted
+                    stats.bars_upserted += upserted
+                    if deleted < self.batch_size:
+                        break
+                    await self._pause()
+
+                # Bars: keyed by their wall-clock start time, like tick timestamps
+                bar_cutoff = datetime.now() - timedelta(days=policy.bar_days)
+                while True:
+                    deleted = await self._call(self.db.delete_old_bars, symbol, bar_cutoff, self.batch_size)
+                    stats.bars_deleted += deleted
+                    if deleted < self.batch_size:
+                        break
+                    await self._pause()
+
+            await self._compact_file()
+        finally:
+            after = await self._call(self.db.storage_stats)
+            if before and after:
+                stats.bytes_reclaimed += max(before["page_count"] - after["page_count"], 0) * after["page_size"]
+                stats.db_bytes = after["page_count"] * after["page_size"]
+                stats.free_bytes = after["freelist_count"] * after["page_size"]
+            stats.runs += 1
+            stats.running = False
+            stats.current_symbol = None
+            stats.last_run_seconds = time.monotonic() - started
+
+        logger.info(
+            f"✅ Retention run: {stats.ticks_deleted} ticks / {stats.bars_deleted} bars deleted "
+            f"so far, {stats.bytes_reclaimed} bytes reclaimed"
+        )
+        return stats
+
+    async def _compact_file(self) -> None:
+        """Checkpoint the WAL and release free pages a few at a time."""
+        await self._call(self.db.checkpoint)
+
+        info = await self._call(self.db.storage_stats)
+        if info.get("auto_vacuum") != 2:
+            if not self.convert_vacuum:
+                if info.get("freelist_count"):
+                    logger.warning("⚠️ auto_vacuum is not INCREMENTAL and conversion is off; the file won't shrink")
+                return
+            logger.info("🧹 Converting the database to auto_vacuum=INCREMENTAL (one-off full VACUUM)...")
+            if not await self._call(self.db.enable_incremental_vacuum):
+                self.convert_vacuum = False  # Don't stall writers again every run
+                return
+            info = await self._call(self.db.storage_stats)
+            logger.info(f"✅ auto_vacuum converted; file is now {info.get('page_count', 0) * info.get('page_size', 0)} bytes")
+
+        free = info.get("freelist_count", 0)
+        while free > 0:
+            await self._call(self.db.incremental_vacuum, self.vacuum_pages)
+            await self._pause()
+            remaining = (await self._call(self.db.storage_stats)).get("freelist_count", 0)
+            if remaining >= free:
+                break  # No progress (e.g. vacuum failed); try again next run
+            free = remaining
+        await self._call(self.db.checkpoint)
+
+    async def run(self) -> None:
+        """Run retention every ``interval`` seconds until cancelled (not at all without policies)."""
+        if not self.policies:
+            logger.info("Retention disabled: no policies in $QUANT_RETENTION, keeping all ticks")
+            return
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Retention error: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,122 @@
+from typing import Optional
+
+import numpy as np
+from models import Tick, SIDE_SIGN, NO_TRADE_ID
+
+_SIDE_NAME = {sign: side for side, sign in SIDE_SIGN.items()}
+
+
+class TickRingBuffer:
+    """
+    Fixed-capacity, column-oriented buffer of the most recent ticks for one symbol.
+
+    Columns match TickDatabase.get_tick_columns: timestamp (epoch ms of the
+    stored wall-clock time), price, size, side (+1 buy / -1 sell / 0 unknown),
+    trade_id (NO_TRADE_ID if unknown).
+    Appends are O(batch); reads return chronological copies.
+    """
+
+    COLUMNS = ("timestamp", "price", "size", "side", "trade_id")
+
+    def __init__(self, symbol: str, capacity: int = 10000):
+        self.symbol = symbol.lower()
+        self.capacity = capacity
+        self._data = {
+            "timestamp": np.zeros(capacity, dtype=np.int64),
+            "price": np.zeros(capacity, dtype=np.float64),
+            "size": np.zeros(capacity, dtype=np.float64),
+            "side": np.zeros(capacity, dtype=np.int64),
+            "trade_id": np.full(capacity, NO_TRADE_ID, dtype=np.int64),
+        }
+        self._head = 0  # Next write position
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """Epoch ms of the newest tick, or None if empty."""
+        if self._size == 0:
+            return None
+        return int(self._data["timestamp"][(self._head - 1) % self.capacity])
+
+    def extend(self, columns: dict[str, np.ndarray]) -> None:
+        """Append chronological tick columns, overwriting the oldest entries."""
+        n = len(columns["timestamp"])
+        if n == 0:
+            return
+        if n > self.capacity:
+            columns = {name: values[-self.capacity:] for name, values in columns.items()}
+            n = self.capacity
+
+        idx = (self._head + np.arange(n)) % self.capacity
+        for name in self.COLUMNS:
+            self._data[name][idx] = columns[name]
+        self._head = (self._head + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def unseen(self, columns: dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Mask of chronological ``columns`` rows that come after the buffer's
+        contents: later than its newest tick, or in that same millisecond with
+        a trade id it doesn't hold. Id-less ticks in that millisecond can't be
+        told apart, so they count as seen; so does the whole millisecond if the
+        buffer's own ticks there lack ids (e.g. restored from an old snapshot).
+        """
+        last = self.last_timestamp
+        if last is None:
+            return np.ones(len(columns["timestamp"]), dtype=bool)
+
+        newer = columns["timestamp"] > last
+        tail = self.latest_columns()
+        held = tail["trade_id"][tail["timestamp"] == last]
+        if (held == NO_TRADE_ID).any():
+            return newer
+        same = columns["timestamp"] == last
+        return newer | (same & (columns["trade_id"] != NO_TRADE_ID) & ~np.isin(columns["trade_id"], held))
+
+    def extend_ticks(self, ticks: list[Tick]) -> None:
+        """Append chronological Tick objects."""
+        if not ticks:
+            return
+        self.extend(ticks_to_columns(ticks))
+
+    def latest_columns(self, limit: Optional[int] = None) -> dict[str, np.ndarray]:
+        """Last ``limit`` ticks (all if None) as columns, oldest first."""
+        n = self._size if limit is None else min(limit, self._size)
+        idx = (self._head - n + np.arange(n)) % self.capacity
+        return {name: self._data[name][idx] for name in self.COLUMNS}
+
+    def latest_ticks(self, limit: Optional[int] = None) -> list[Tick]:
+        """Last ``limit`` ticks as Tick objects, oldest first."""
+        columns = self.latest_columns(limit)
+        timestamps = columns["timestamp"].astype("datetime64[ms]").astype(object)
+        return [
+            Tick(
+                symbol=self.symbol,
+                timestamp=ts,
+                price=price,
+                size=size,
+                side=_SIDE_NAME.get(side),
+                trade_id=None if trade_id == NO_TRADE_ID else trade_id,
+            )
+            for ts, price, size, side, trade_id in zip(
+                timestamps,
+                columns["price"].tolist(),
+                columns["size"].tolist(),
+                columns["side"].tolist(),
+                columns["trade_id"].tolist(),
+            )
+        ]
+
+
+def ticks_to_columns(ticks: list[Tick]) -> dict[str, np.ndarray]:
+    """Tick objects -> ring buffer / microstructure columns."""
+    return {
+        "timestamp": np.array([t.timestamp for t in ticks], dtype="datetime64[ms]").astype(np.int64),
+        "price": np.array([t.price for t in ticks], dtype=np.float64),
+        "size": np.array([t.size for t in ticks], dtype=np.float64),
+        "side": np.array([SIDE_SIGN.get(t.side, 0) for t in ticks], dtype=np.int64),
+        "trade_id": np.array([NO_TRADE_ID if t.trade_id is None else t.trade_id for t in ticks], dtype=np.int64),
+    }
@@ -0,0 +1,106 @@
+import logging
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from ring_buffer import TickRingBuffer
+from analytics import Microstructure
+from pairs import PairScanner
+from models import NO_TRADE_ID
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+PAIRS_PREFIX = "_pairs"  # Pair scanner keys; symbols never start with "_"
+
+
+def capture_state(buffers: dict[str, TickRingBuffer],
+                  trackers: dict[str, Microstructure],
+                  scanner: Optional[PairScanner] = None) -> dict[str, np.ndarray]:
+    """
+    Copy the hot analytic state into flat arrays.
+
+    Cheap enough to run on the event loop; the result can then be written from
+    a worker thread without racing live updates. Microstructure windows are
+    rebuilt from the buffered ticks on restore, so only their CVD is stored.
+    The pair scanner's rolling samples are stored whole, since its window is
+    usually longer than the buffers reach back.
+    """
+    arrays = {
+        "version": np.array(SNAPSHOT_VERSION),
+        "saved_at": np.array(time.time()),
+    }
+    for symbol, buffer in buffers.items():
+        for name, values in buffer.latest_columns().items():
+            arrays[f"{symbol}/{name}"] = values
+    for symbol, tracker in trackers.items():
+        arrays[f"{symbol}/cvd"] = np.array(tracker.cvd)
+        arrays[f"{symbol}/window_seconds"] = np.array(tracker.window_ms / 1000.0)
+    if scanner is not None:
+        for name, values in scanner.state().items():
+            arrays[f"{PAIRS_PREFIX}/{name}"] = np.array(values, copy=True)
+    return arrays
+
+
+def write_snapshot(path: str, arrays: dict[str, np.ndarray]) -> None:
+    """Atomically write captured state as an uncompressed .npz (write-then-rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str, capacity: int = 10000, scanner: Optional[PairScanner] = None
+                  ) -> Optional[tuple[dict[str, TickRingBuffer], dict[str, Microstructure]]]:
+    """
+    Restore buffers and microstructure trackers from a snapshot, and the pair
+    scanner's samples into ``scanner`` if given.
+
+    Returns None if there is no usable snapshot; callers then cold-start from storage.
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with np.load(path) as data:
+            if int(data["version"]) != SNAPSHOT_VERSION:
+                logger.warning(f"⚠️ Ignoring snapshot {path}: version {int(data['version'])}")
+                return None
+            files = set(data.files)
+            symbols = {key.split("/", 1)[0] for key in files if "/" in key} - {PAIRS_PREFIX}
+
+            buffers = {}
+            trackers = {}
+            for symbol in symbols:
+                buffer = TickRingBuffer(symbol, capacity)
+                if f"{symbol}/timestamp" in files:
+                    columns = {}
+                    for name in TickRingBuffer.COLUMNS:
+                        key = f"{symbol}/{name}"
+                        # trade_id was added later; older snapshots just lack the ids
+                        columns[name] = data[key] if key in files else np.full(
+                            len(data[f"{symbol}/timestamp"]), NO_TRADE_ID, dtype=np.int64)
+                    buffer.extend(columns)
+                buffers[symbol] = buffer
+
+                if f"{symbol}/cvd" in files:
+                    tracker = Microstructure(symbol, float(data[f"{symbol}/window_seconds"]))
+                    columns = buffer.latest_columns()
+                    tracker.update_columns(columns["timestamp"], columns["price"], columns["size"], columns["side"])
+                    tracker.cvd = float(data[f"{symbol}/cvd"])
+                    trackers[symbol] = tracker
+
+            pair_keys = [key for key in files if key.startswith(f"{PAIRS_PREFIX}/")]
+            if scanner is not None and pair_keys:
+                state = {key.split("/", 1)[1]: data[key] for key in pair_keys}
+                if not scanner.restore(state):
+                    logger.warning("⚠️ Pair scanner settings changed; not restoring its samples")
+
+            age = time.time() - float(data["saved_at"])
+        logger.info(f"✅ Restored snapshot for {len(buffers)} symbols ({age:.0f}s old)")
+        return buffers, trackers
+    except Exception as e:
+        logger.error(f"Snapshot restore failed, cold-starting: {e}")
+        return None
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Optional
+
+import numpy as np
+
+from models import Tick, OHLCV
+from database import TickDatabase, COMPACT_INTERVAL
+from analytics import Analytics
+
+logger = logging.getLogger(__name__)
+
+# Open-ended range scans are clamped to these (ISO strings compare lexically)
+MIN_TS = datetime(1970, 1, 1)
+MAX_TS = datetime(9999, 12, 31)
+
+
+class StoreUnavailable(RuntimeError):
+    """A backend's package is installed but it can't start (e.g. an extension won't load)."""
+
+
+class TickStore(ABC):
+    """Async storage interface for ticks. Implementations must not block the event loop."""
+
+    @abstractmethod
+    async def insert_batch(self, ticks: list[Tick]) -> int:
+        """Insert ticks, returning how many were written."""
+
+    @abstractmethod
+    async def range_scan(self, symbol: str, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> list[Tick]:
+        """Ticks in [start, end], oldest first. ``None`` leaves that side open."""
+
+    @abstractmethod
+    async def latest(self, symbol: str, limit: int = 1000) -> list[Tick]:
+        """Last N ticks, oldest first."""
+
+    @abstractmethod
+    async def latest_columns(self, symbol: str, limit: int = 1000) -> dict[str, np.ndarray]:
+        """Last N ticks as TickRingBuffer.COLUMNS columns (timestamp epoch ms, ...), oldest first."""
+
+    @abstractmethod
+    async def aggregate_bars(self, symbol: str, interval_seconds: int,
+                             start: Optional[datetime] = None,
+                             end: Optional[datetime] = None) -> list[OHLCV]:
+        """
+        OHLCV + VWAP bars over [start, end], oldest first. Raises ValueError if
+        the range reaches compacted history and the interval can't be built from it.
+        """
+
+    @abstractmethod
+    async def count(self, symbol: str) -> int:
+        """Number of stored ticks for a symbol."""
+
+    async def close(self) -> None:
+        """Release executors/connections."""
+
+    @staticmethod
+    def _merge_compacted(compacted: list[OHLCV], bars: list[OHLCV],
+                         interval_seconds: int) -> list[OHLCV]:
+        """
+        Merge compacted history (stored COMPACT_INTERVAL bars whose raw ticks
+        retention has deleted) with bars built from the remaining raw ticks.
+        
+        Retention compacts by arrival time, not trade time, so compacted bars
+        may be older than, newer than or interleaved with raw ones (e.g. after
+        an upload of old history). Both lists are merged by timestamp and
+        buckets present in both are combined, open/close by trade time.
+        
+        Raises ValueError if compacted history is in range but
+        ``interval_seconds`` is not a multiple of COMPACT_INTERVAL, rather than
+        silently leaving that history out.
+        """
+        if not compacted:
+            return bars
+        if interval_seconds % COMPACT_INTERVAL:
+            until = (compacted[-1].timestamp + timedelta(seconds=COMPACT_INTERVAL)).isoformat()
+            raise ValueError(
+                f"History before {until} is only kept as {COMPACT_INTERVAL}s bars; use an "
+                f"interval that is a multiple of {COMPACT_INTERVAL}s or start at {until} or later"
+            )
+        older = Analytics.resample_bars(compacted, interval_seconds)
+        if not bars or older[-1].timestamp < bars[0].timestamp:
+            return older + bars  # Usual case: compacted history strictly first
+        merged = sorted(older + bars, key=lambda b: b.timestamp)
+        return Analytics.resample_bars(merged, interval_seconds)
+
+
+class SQLiteTickStore(TickStore):
+    """
+    TickDatabase driven from a dedicated single-thread executor.
+
+    SQLite serializes writers anyway, so one thread keeps ordering simple and
+    stops storage work from competing with request handlers in the default pool.
+    """
+
+    def __init__(self, db: TickDatabase):
+        self.db = db
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-io")
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args))
+
+    async def insert_batch(self, ticks: list[Tick]) -> int:
+        return await self._run(self.db.insert_batch, ticks)
+
+    async def range_scan(self, symbol, start=None, end=None):
+        return await self._run(self.db.get_ticks_by_timerange, symbol, start or MIN_TS, end or MAX_TS)
+
+    async def latest(self, symbol, limit=1000):
+        return await self._run(self.db.get_ticks, symbol, limit)
+
+    async def latest_columns(self, symbol, limit=1000):
+        return await self._run(self.db.get_tick_columns, symbol, limit)
+
+    async def aggregate_bars(self, symbol, interval_seconds, start=None, end=None):
+        def _bars():
+            columns = self.db.get_tick_columns_by_timerange(symbol, start or MIN_TS, end or MAX_TS)
+            bars = Analytics.compute_ohlcv_columns(symbol.lower(), columns, interval_seconds)
+            compacted = self.db.get_bars(symbol, COMPACT_INTERVAL, start or MIN_TS, end or MAX_TS)
+            return self._merge_compacted(compacted, bars, interval_seconds)
+        return await self._run(_bars)
+
+    async def count(self, symbol):
+        return await self._run(self.db.get_tick_count, symbol)
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class DuckDBTickStore(SQLiteTickStore):
+    """
+    SQLite for writes and point lookups, DuckDB for analytical scans.
+
+    DuckDB attaches the same SQLite file read-only, so there is a single source
+    of truth; range scans and bar/VWAP aggregation run in DuckDB's vectorized,
+    multi-threaded engine on a separate executor from the SQLite writer.
+
+    Raises ImportError without the duckdb package, and StoreUnavailable if the
+    sqlite extension can't be installed/loaded (e.g. offline) or the attach fails.
+    """
+
+    def __init__(self, db: TickDatabase, workers: int = 4):
+        super().__init__(db)
+        import duckdb
+
+        self._duck = duckdb.connect()
+        try:
+            self._attach(db.db_path)
+        except duckdb.Error as e:
+            self._duck.close()
+            self._executor.shutdown(wait=False)
+            raise StoreUnavailable(str(e).splitlines()[0]) from e
+        self._scan_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="duckdb")
+
+    def _attach(self, db_path: str) -> None:
+        """Expose the SQLite file's tables to DuckDB as ``src``."""
+        # Explicit, so a missing extension fails here rather than mid-ATTACH
+        self._duck.execute("INSTALL sqlite")
+        self._duck.execute("LOAD sqlite")
+        # ATTACH takes no bound parameters; quote the path as a SQL literal
+        path = db_path.replace("'", "''")
+        self._duck.execute(f"ATTACH '{path}' AS src (TYPE sqlite, READ_ONLY)")
+
+    async def _scan(self, sql: str, params: list):
+        def _query():
+            # One cursor per call: DuckDB connections are not shared across threads
+            cursor = self._duck.cursor()
+            try:
+                return cursor.execute(sql, params).fetchall()
+            finally:
+                cursor.close()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._scan_executor, _query)
+
+    async def range_scan(self, symbol, start=None, end=None):
+        rows = await self._scan(
+            """SELECT symbol, CAST(timestamp AS TIMESTAMP), price, size, side, trade_id
+               FROM src.ticks
+               WHERE symbol = ? AND timestamp BETWEEN ? AND ?
+               ORDER BY timestamp ASC""",
+            [symbol.lower(), (start or MIN_TS).isoformat(), (end or MAX_TS).isoformat()]
+        )
+        return [
+            Tick(symbol=r[0], timestamp=r[1], price=r[2], size=r[3], side=r[4], trade_id=r[5])
+            for r in rows
+        ]
+
+    async def aggregate_bars(self, symbol, interval_seconds, start=None, end=None):
+        width = interval_seconds * 1000
+        rows = await self._scan(
+            """WITH t AS (
+                   SELECT epoch_ms(CAST(timestamp AS TIMESTAMP)) AS ts, price, size
+                   FROM src.ticks
+                   WHERE symbol = ? AND timestamp BETWEEN ? AND ?
+               )
+               SELECT ts // ? * ? AS bucket,
+                      arg_min(price, ts), max(price), min(price), arg_max(price, ts),
+                      sum(size), sum(price * size) / nullif(sum(size), 0), min(ts), max(ts)
+               FROM t
+               GROUP BY bucket
+               ORDER BY bucket""",
+            [symbol.lower(), (start or MIN_TS).isoformat(), (end or MAX_TS).isoformat(), width, width]
+        )
+        bars = [
+            OHLCV(
+                symbol=symbol.lower(),
+                timestamp=MIN_TS + timedelta(milliseconds=bucket),
+                open=o, high=h, low=l, close=c, volume=v, vwap=vwap,
+                first_trade_at=MIN_TS + timedelta(milliseconds=first),
+                last_trade_at=MIN_TS + timedelta(milliseconds=last),
+            )
+            for bucket, o, h, l, c, v, vwap, first, last in rows
+        ]
+        compacted = await self._run(self.db.get_bars, symbol, COMPACT_INTERVAL, start or MIN_TS, end or MAX_TS)
+        return self._merge_compacted(compacted, bars, interval_seconds)
+
+    async def close(self):
+        await super().close()
+        self._scan_executor.shutdown(wait=True)
+        self._duck.close()
+
+
+STORAGE_BACKENDS = {
+    "sqlite": SQLiteTickStore,
+    "duckdb": DuckDBTickStore,
+}
+
+
+def create_store(db: TickDatabase, backend: Optional[str] = None) -> TickStore:
+    """
+    Build the configured store. ``backend`` defaults to $QUANT_STORAGE_BACKEND,
+    then "sqlite". Falls back to SQLite if the backend can't start: package
+    missing, or (DuckDB) its sqlite extension unavailable, e.g. on an offline host.
+    """
+    backend = (backend or os.getenv("QUANT_STORAGE_BACKEND", "sqlite")).lower()
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend {backend!r}; expected one of {sorted(STORAGE_BACKENDS)}")
+
+    try:
+        store = STORAGE_BACKENDS[backend](db)
+    except ImportError:
+        logger.warning(f"⚠️ {backend} not installed, falling back to sqlite storage")
+        store = SQLiteTickStore(db)
+    except StoreUnavailable as e:
+        logger.warning(f"⚠️ {backend} unavailable ({e}), falling back to sqlite storage")
+        store = SQLiteTickStore(db)
+
+    logger.info(f"✅ Storage backend: {type(store).__name__}")
+    return store
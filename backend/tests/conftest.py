@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Backend modules import each other flat (``from models import Tick``), as when
+# uvicorn runs from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
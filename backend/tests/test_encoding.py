@@ -0,0 +1,77 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from encoding import (
+    COLUMNAR_MEDIA_TYPE, JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE,
+    bar_columns, decode_columnar, encode_columnar, encode_frame, encode_json, epoch_ms, negotiate,
+)
+from models import OHLCV
+
+
+def test_columnar_round_trip():
+    columns = {
+        "timestamp": np.array([1_700_000_000_000, 1_700_000_000_250, 1_700_000_001_000], dtype=np.int64),
+        "price": np.array([67000.5, 67001.25, 66999.0]),
+        "size": np.array([0.001, 2.5, 0.3]),
+        "side": np.array([1, -1, 0], dtype=np.int64),
+    }
+    decoded, meta = decode_columnar(encode_columnar(columns, {"symbol": "btcusdt"}))
+
+    assert meta == {"symbol": "btcusdt"}
+    assert list(decoded) == list(columns)
+    for name, values in columns.items():
+        assert decoded[name].dtype.kind == values.dtype.kind
+        np.testing.assert_array_equal(decoded[name], values)
+
+
+def test_columnar_round_trip_empty_and_aligned():
+    buf = encode_columnar({"timestamp": np.array([], dtype=np.int64), "price": np.array([])})
+    decoded, meta = decode_columnar(buf)
+    assert meta == {}
+    assert len(decoded["timestamp"]) == 0 and len(decoded["price"]) == 0
+    assert len(buf) % 8 == 0
+
+
+def test_columnar_rejects_ragged_columns():
+    with pytest.raises(ValueError):
+        encode_columnar({"a": np.zeros(2), "b": np.zeros(3)})
+
+
+@pytest.mark.parametrize("accept, fmt, expected", [
+    (None, None, JSON_MEDIA_TYPE),
+    ("*/*", None, JSON_MEDIA_TYPE),
+    (COLUMNAR_MEDIA_TYPE, None, COLUMNAR_MEDIA_TYPE),
+    (f"{COLUMNAR_MEDIA_TYPE};q=0", None, JSON_MEDIA_TYPE),
+    (f"{JSON_MEDIA_TYPE}, {COLUMNAR_MEDIA_TYPE}", None, JSON_MEDIA_TYPE),
+    (f"{JSON_MEDIA_TYPE};q=0.5, {COLUMNAR_MEDIA_TYPE}", None, COLUMNAR_MEDIA_TYPE),
+    (f"{COLUMNAR_MEDIA_TYPE};q=0.8, {MSGPACK_MEDIA_TYPE};q=0.9", None, MSGPACK_MEDIA_TYPE),
+    (JSON_MEDIA_TYPE, "columnar", COLUMNAR_MEDIA_TYPE),
+])
+def test_negotiate(accept, fmt, expected):
+    assert negotiate(accept, fmt) == expected
+
+
+def test_binary_frames_carry_epoch_ms():
+    msgpack = pytest.importorskip("msgpack")
+    ts = datetime(2026, 10, 19, 8, 0, 0, 123000)
+    message = {"type": "tick", "data": {"timestamp": ts, "price": 1.5}}
+
+    assert epoch_ms(ts) == int(np.datetime64(ts, "ms").astype(np.int64))
+    assert msgpack.unpackb(encode_frame(message, MSGPACK_MEDIA_TYPE))["data"]["timestamp"] == epoch_ms(ts)
+    assert '"timestamp":"2026-10-19T08:00:00.123000"' in encode_json(message)
+
+
+def test_bar_columns_match_json_bars():
+    bars = [
+        OHLCV(symbol="btcusdt", timestamp=datetime(2026, 10, 19, 8, 0), open=1.0, high=2.0,
+              low=0.5, close=1.5, volume=3.0, vwap=1.2),
+        OHLCV(symbol="btcusdt", timestamp=datetime(2026, 10, 19, 8, 1), open=1.5, high=1.5,
+              low=1.5, close=1.5, volume=0.0),
+    ]
+    decoded, _ = decode_columnar(encode_columnar(bar_columns(bars)))
+
+    assert set(decoded) == {"timestamp", "open", "high", "low", "close", "volume", "vwap"}
+    assert decoded["timestamp"].tolist() == [epoch_ms(b.timestamp) for b in bars]
+    assert decoded["vwap"][0] == 1.2 and np.isnan(decoded["vwap"][1])
@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from analytics import Microstructure
+from database import TickDatabase
+from models import Tick
+from pairs import PairScanner
+from ring_buffer import TickRingBuffer
+from snapshot import capture_state, write_snapshot
+from storage import SQLiteTickStore
+
+
+@pytest.fixture
+def app_state(tmp_path, monkeypatch):
+    """main's module-level state, pointed at a fresh database and snapshot path."""
+    monkeypatch.chdir(tmp_path)  # main opens ticks.db in the working directory on import
+    import main
+
+    store = SQLiteTickStore(TickDatabase(str(tmp_path / "ticks.db")))
+    monkeypatch.setattr(main, "store", store)
+    monkeypatch.setattr(main, "buffers", {})
+    monkeypatch.setattr(main, "microstructure", {})
+    monkeypatch.setattr(main, "pending_ticks", {})
+    monkeypatch.setattr(main, "unsaved_ticks", [])
+    monkeypatch.setattr(main, "pair_scanner", PairScanner(window=main.pair_scanner.window))
+    monkeypatch.setattr(main, "SNAPSHOT_PATH", str(tmp_path / "snapshot.npz"))
+    yield main
+    asyncio.run(store.close())
+
+
+def make_ticks(symbol, start, n, first_id=0):
+    return [
+        Tick(symbol=symbol, timestamp=start + timedelta(milliseconds=10 * i), price=100.0 + i,
+             size=1.0, side="buy" if i % 2 else "sell", trade_id=first_id + i)
+        for i in range(n)
+    ]
+
+
+def test_unknown_symbol_microstructure_is_not_tracked(app_state):
+    asyncio.run(app_state.store.insert_batch(make_ticks("dogeusdt", datetime(2026, 1, 1), 10)))
+
+    snap = asyncio.run(app_state.get_microstructure_snapshot("DOGEUSDT"))
+    assert snap["tick_count"] == 10
+    assert "dogeusdt" not in app_state.microstructure
+    assert "dogeusdt" not in app_state.buffers
+
+
+def test_relay_gap_rebuilds_api_node_state(app_state, monkeypatch):
+    main = app_state
+    monkeypatch.setattr(main, "broadcast", lambda message: asyncio.sleep(0))
+    ticks = make_ticks("btcusdt", datetime(2026, 1, 1), 30)
+
+    async def scenario():
+        for seq, tick in enumerate(ticks[:10], 1):
+            await main.on_relay_message(seq, {"type": "tick", "data": tick.model_dump()})
+        main.apply_pending()
+        assert len(main.buffers["btcusdt"]) == 10
+
+        # Ticks 11..20 were trimmed from the relay log while this node was away
+        await main.on_relay_gap(10, 21)
+        for seq, tick in enumerate(ticks[20:], 21):
+            await main.on_relay_message(seq, {"type": "tick", "data": tick.model_dump()})
+        main.apply_pending()
+
+    asyncio.run(scenario())
+    buffered = main.buffers["btcusdt"].latest_ticks(100)
+    assert [t.trade_id for t in buffered] == list(range(20, 30))  # No hole
+    assert main.microstructure["btcusdt"].snapshot().tick_count == 10
+
+
+def burst_ticks(symbol, start, n):
+    """Ticks five to a millisecond, as aggTrade bursts arrive."""
+    return [
+        Tick(symbol=symbol, timestamp=start + timedelta(milliseconds=i // 5), price=100.0 + i,
+             size=1.0 + i % 3, side="buy" if i % 2 else "sell", trade_id=i)
+        for i in range(n)
+    ]
+
+
+def signed_volume(ticks):
+    return sum(t.size if t.side == "buy" else -t.size for t in ticks)
+
+
+def take_snapshot(main, ticks, cvd_offset=0.0):
+    """Snapshot of a node that had applied ``ticks`` (CVD offset by earlier history)."""
+    buffer = TickRingBuffer("btcusdt", main.BUFFER_CAPACITY)
+    buffer.extend_ticks(ticks)
+    tracker = Microstructure("btcusdt", main.MICROSTRUCTURE_WINDOW_SECONDS)
+    columns = buffer.latest_columns()
+    tracker.update_columns(columns["timestamp"], columns["price"], columns["size"], columns["side"])
+    tracker.cvd += cvd_offset
+    write_snapshot(main.SNAPSHOT_PATH, capture_state({"btcusdt": buffer}, {"btcusdt": tracker}))
+
+
+@pytest.mark.parametrize("split", [62, 65])  # Mid-millisecond and on a millisecond boundary
+def test_warm_start_backfills_ticks_stored_after_snapshot(app_state, split):
+    main = app_state
+    ticks = burst_ticks("btcusdt", datetime(2026, 1, 1, 12), 100)
+    take_snapshot(main, ticks[:split], cvd_offset=1000.0)
+    asyncio.run(main.store.insert_batch(ticks))  # Includes the rest of the snapshot's last ms
+
+    asyncio.run(main.warm_start())
+
+    buffered = main.buffers["btcusdt"].latest_ticks()
+    assert sorted(t.trade_id for t in buffered) == list(range(100))
+    assert main.microstructure["btcusdt"].cvd == pytest.approx(1000.0 + signed_volume(ticks))
+    assert main.microstructure["btcusdt"].snapshot().tick_count == 100
+
+
+def test_warm_start_from_snapshot_without_trade_ids(app_state):
+    main = app_state
+    ticks = burst_ticks("btcusdt", datetime(2026, 1, 1, 12), 100)
+    take_snapshot(main, ticks[:60])
+    with np.load(main.SNAPSHOT_PATH) as data:
+        old = {key: data[key] for key in data.files if key != "btcusdt/trade_id"}
+    write_snapshot(main.SNAPSHOT_PATH, old)
+    asyncio.run(main.store.insert_batch(ticks))
+
+    asyncio.run(main.warm_start())
+
+    # Ids can't dedupe the snapshot's last millisecond, so only strictly newer ticks are added
+    buffered = main.buffers["btcusdt"].latest_ticks()
+    assert [t.trade_id for t in buffered[:60]] == [None] * 60
+    assert sorted(t.trade_id for t in buffered[60:]) == list(range(60, 100))
+    assert main.microstructure["btcusdt"].cvd == pytest.approx(signed_volume(ticks))
+
+
+def test_cold_start_without_snapshot(app_state):
+    main = app_state
+    ticks = burst_ticks("btcusdt", datetime(2026, 1, 1, 12), 50)
+    asyncio.run(main.store.insert_batch(ticks))
+
+    asyncio.run(main.warm_start())
+
+    assert len(main.buffers["btcusdt"]) == 50
+    assert main.microstructure["btcusdt"].cvd == pytest.approx(signed_volume(ticks))
+    assert len(main.buffers["ethusdt"]) == 0
+
+
+def test_bars_interval_finer_than_compacted_history_is_400(app_state):
+    from fastapi.testclient import TestClient
+
+    main = app_state
+    db = main.store.db
+    db.insert_batch(make_ticks("btcusdt", datetime(2026, 1, 1), 50))
+    db.compact_ticks("btcusdt", "9999-12-31 00:00:00")
+
+    client = TestClient(main.app)  # No startup: no Binance feed or background tasks
+    assert client.get("/api/bars/btcusdt?interval=60").json()[0]["volume"] == 50.0
+    response = client.get("/api/bars/btcusdt?interval=30")
+    assert response.status_code == 400
+    assert "multiple of 60s" in response.json()["detail"]
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import pairs
+from pairs import PairScanner
+from snapshot import capture_state, load_snapshot, write_snapshot
+
+
+def fill(scanner: PairScanner, steps: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    common = np.cumsum(rng.normal(0, 0.01, steps))
+    for k in range(steps):
+        for j in range(5):
+            scanner.observe(f"s{j}", float(np.exp(3 + common[k] * (1 + 0.2 * j) + rng.normal(0, 0.003))))
+        scanner.sample()
+
+
+def test_correlation_matrix_matches_corrcoef():
+    scanner = PairScanner(window=50)
+    fill(scanner, 137)  # Not a multiple of the window: exercises the rank-1 add/remove path
+
+    returns = np.roll(scanner._returns, -(scanner._steps % scanner.window), axis=0)
+    np.testing.assert_allclose(scanner.correlation_matrix(), np.corrcoef(returns.T), atol=1e-12)
+
+
+def test_snapshot_restores_scanner(tmp_path):
+    scanner = PairScanner(window=50)
+    fill(scanner, 80)
+    path = str(tmp_path / "snapshot.npz")
+    write_snapshot(path, capture_state({}, {}, scanner))
+
+    restored = PairScanner(window=50)
+    buffers, trackers = load_snapshot(path, scanner=restored)
+    assert buffers == {} and trackers == {}  # Scanner keys are not mistaken for symbols
+    assert restored.symbols == scanner.symbols
+    np.testing.assert_allclose(restored.correlation_matrix(), scanner.correlation_matrix(), atol=1e-12)
+
+    mismatched = PairScanner(window=60)
+    load_snapshot(path, scanner=mismatched)
+    assert mismatched.symbols == []
+
+
+def test_restore_does_not_book_downtime_move(tmp_path):
+    scanner = PairScanner(window=50)
+    fill(scanner, 80)
+    path = str(tmp_path / "snapshot.npz")
+    write_snapshot(path, capture_state({}, {}, scanner))
+
+    restored = PairScanner(window=50)
+    load_snapshot(path, scanner=restored)
+    restored.observe("s0", float(restored._latest[0] * 1.5))  # Moved 50% while down
+    restored.sample()
+
+    last = restored._returns[(restored._steps - 1) % restored.window]
+    assert last[0] == 0.0
+    restored.observe("s0", float(restored._latest[0] * 1.01))
+    restored.sample()
+    assert restored._returns[(restored._steps - 1) % restored.window][0] == pytest.approx(np.log(1.01))
+
+
+@pytest.mark.parametrize("methods, expected", [
+    (["fork", "spawn", "forkserver"], "forkserver"),
+    (["spawn"], "spawn"),  # Windows
+])
+def test_pool_never_forks(monkeypatch, methods, expected):
+    monkeypatch.setattr(pairs.multiprocessing, "get_all_start_methods", lambda: methods)
+    assert pairs._pool_context().get_start_method() == expected
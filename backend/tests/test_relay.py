@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+from relay import RelayClient, RelayHub, RelayServer
+
+
+async def wait_for(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("timed out")
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture(params=["inproc", "unix"])
+def address(request, tmp_path):
+    if request.param == "inproc":
+        return f"inproc://{tmp_path.name}"
+    return f"unix://{tmp_path / 'relay.sock'}"
+
+
+def test_replay_and_reconnect(address):
+    async def scenario():
+        hub = RelayHub()
+        server = RelayServer(hub, address)
+        await server.start()
+
+        got = []
+
+        async def on_message(seq, message):
+            got.append((seq, message["i"]))
+
+        for i in range(5):
+            hub.publish({"i": i})  # Before the node connects: replayed
+
+        client = RelayClient(address, on_message)
+        task = asyncio.create_task(client.run())
+        await wait_for(lambda: len(got) == 5)
+        for i in range(5, 10):
+            hub.publish({"i": i})  # Live
+        await wait_for(lambda: len(got) == 10)
+
+        # Drop the node, publish while it is away, reconnect: it resumes from last_seq
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        for i in range(10, 15):
+            hub.publish({"i": i})
+        task = asyncio.create_task(client.run())
+        await wait_for(lambda: len(got) == 15)
+
+        assert got == [(i + 1, i) for i in range(15)]
+        assert client.last_seq == hub.seq == 15
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_publisher_restart_replays_full_log(address):
+    async def scenario():
+        got = []
+
+        async def on_message(seq, message):
+            got.append((seq, message["i"]))
+
+        hub = RelayHub()
+        server = RelayServer(hub, address)
+        await server.start()
+        for i in range(3):
+            hub.publish({"i": i})
+        client = RelayClient(address, on_message)
+        task = asyncio.create_task(client.run())
+        await wait_for(lambda: len(got) == 3)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await server.close()
+
+        # New publisher process: new epoch, sequence numbers start again at 1
+        hub = RelayHub()
+        server = RelayServer(hub, address)
+        await server.start()
+        hub.publish({"i": 100})
+        got.clear()
+        task = asyncio.create_task(client.run())
+        await wait_for(lambda: len(got) == 1)
+        assert got == [(1, 100)]
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_bounded_replay_log():
+    hub = RelayHub(replay_size=3)
+    for i in range(5):
+        hub.publish({"i": i})
+    sub = hub.subscribe(1, hub.epoch)
+    assert [seq for seq, _ in sub.backlog] == [3, 4, 5]
+    assert hub.oldest_seq == 3
+
+
+def test_slow_subscriber_is_dropped():
+    async def scenario():
+        hub = RelayHub(max_pending=3)
+        sub = hub.subscribe(0, hub.epoch)
+        for i in range(5):
+            hub.publish({"i": i})
+        assert sub.overflowed
+        assert hub.subscriber_count == 0
+
+    asyncio.run(scenario())
+
+
+def test_gap_is_reported_before_replay(address):
+    async def scenario():
+        hub = RelayHub(replay_size=4)
+        server = RelayServer(hub, address)
+        await server.start()
+
+        events = []
+
+        async def on_message(seq, message):
+            events.append(("msg", seq))
+
+        async def on_gap(last_seq, oldest_seq):
+            events.append(("gap", last_seq, oldest_seq))
+
+        client = RelayClient(address, on_message, on_gap)
+        hub.publish({"i": 0})
+        task = asyncio.create_task(client.run())
+        await wait_for(lambda: len(events) == 1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        for i in range(1, 10):  # Seq 2..10; only 7..10 stay in the log
+            hub.publish({"i": i})
+        task = asyncio.create_task(client.run())
+        await wait_for(lambda: len(events) == 6)
+        assert events == [("msg", 1), ("gap", 1, 7), ("msg", 7), ("msg", 8), ("msg", 9), ("msg", 10)]
+
+        # A fresh node joining late has no state to lose: no gap
+        fresh = []
+
+        async def on_late_message(seq, message):
+            fresh.append(seq)
+
+        async def on_late_gap(last_seq, oldest_seq):
+            fresh.append((last_seq, oldest_seq))
+
+        late = RelayClient(address, on_late_message, on_late_gap)
+        late_task = asyncio.create_task(late.run())
+        await wait_for(lambda: len(fresh) == 4)
+        assert fresh == [7, 8, 9, 10]
+
+        for t in (task, late_task):
+            t.cancel()
+        await asyncio.gather(task, late_task, return_exceptions=True)
+        await server.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,173 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from analytics import Analytics
+from database import TickDatabase
+from models import Tick
+from retention import RetentionService, load_policies
+from ring_buffer import ticks_to_columns
+from storage import SQLiteTickStore
+
+
+def make_ticks(rng, start: datetime, n: int) -> list[Tick]:
+    """n ticks spread over the hour after ``start``, in trade-time order."""
+    offsets = np.sort(rng.uniform(0, 3600, n))
+    return [
+        Tick(symbol="btcusdt", timestamp=start + timedelta(seconds=float(s)),
+             price=float(100 + rng.normal()), size=float(rng.uniform(0.1, 2.0)),
+             side="buy" if rng.random() < 0.5 else "sell")
+        for s in offsets
+    ]
+
+
+def expire(db: TickDatabase) -> None:
+    """Mark every stored tick as inserted long ago."""
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute("UPDATE ticks SET created_at = datetime('now', '-5 days')")
+
+
+def assert_bars_equal(got, expected):
+    assert [b.timestamp for b in got] == [b.timestamp for b in expected]
+    for g, e in zip(got, expected):
+        assert (g.open, g.high, g.low, g.close) == pytest.approx((e.open, e.high, e.low, e.close))
+        assert g.volume == pytest.approx(e.volume)
+        assert g.vwap == pytest.approx(e.vwap)
+
+
+def run_retention(db: TickDatabase, batch_size: int = 2000,
+                  policies: str = '{"*": {"tick_days": 1, "bar_days": 3650}}', **kwargs) -> RetentionService:
+    service = RetentionService(
+        db, load_policies(policies), ingest_count=lambda: 0,
+        batch_size=batch_size, base_pause=0.0, **kwargs,
+    )
+    asyncio.run(service.run_once())
+    return service
+
+
+@pytest.mark.parametrize("reverse_arrival", [False, True])
+def test_compaction_preserves_bars(tmp_path, reverse_arrival):
+    """
+    Compacted history sits between raw ticks on both sides (as after uploading
+    old history once newer live ticks were compacted), and may have arrived out
+    of trade-time order: /api/bars must still equal bars over all ticks.
+    """
+    rng = np.random.default_rng(7)
+    db = TickDatabase(str(tmp_path / "ticks.db"))
+    day = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    compacted = make_ticks(rng, day - timedelta(days=2), 600)
+    db.insert_batch(compacted[::-1] if reverse_arrival else compacted)
+    expire(db)
+    older, newer = make_ticks(rng, day - timedelta(days=3), 300), make_ticks(rng, day - timedelta(days=1), 300)
+    db.insert_batch(older + newer)
+
+    run_retention(db, batch_size=97)  # Several batches, splitting 1m buckets
+
+    store = SQLiteTickStore(db)
+    try:
+        assert asyncio.run(store.count("btcusdt")) == 600
+        everything = ticks_to_columns(sorted(older + compacted + newer, key=lambda t: t.timestamp))
+        for interval in (60, 300, 3600):
+            expected = Analytics.compute_ohlcv_columns("btcusdt", everything, interval)
+            assert_bars_equal(asyncio.run(store.aggregate_bars("btcusdt", interval)), expected)
+    finally:
+        asyncio.run(store.close())
+
+
+def test_compaction_boundary_bucket(tmp_path):
+    """A bucket split between compacted and raw ticks is merged, not dropped."""
+    rng = np.random.default_rng(3)
+    db = TickDatabase(str(tmp_path / "ticks.db"))
+    ticks = make_ticks(rng, datetime.now().replace(microsecond=0) - timedelta(days=2), 400)
+
+    db.insert_batch(ticks[:250])
+    expire(db)
+    db.insert_batch(ticks[250:])
+    run_retention(db, batch_size=1000)
+
+    store = SQLiteTickStore(db)
+    try:
+        expected = Analytics.compute_ohlcv_columns("btcusdt", ticks_to_columns(ticks), 300)
+        assert_bars_equal(asyncio.run(store.aggregate_bars("btcusdt", 300)), expected)
+    finally:
+        asyncio.run(store.close())
+
+
+def test_interval_finer_than_compacted_history_is_rejected(tmp_path):
+    rng = np.random.default_rng(5)
+    db = TickDatabase(str(tmp_path / "ticks.db"))
+    start = datetime.now().replace(microsecond=0) - timedelta(days=2)
+    ticks = make_ticks(rng, start, 400)
+    db.insert_batch(ticks[:200])
+    expire(db)
+    db.insert_batch(ticks[200:])
+    run_retention(db, batch_size=1000)
+
+    store = SQLiteTickStore(db)
+    try:
+        with pytest.raises(ValueError, match="multiple of 60s"):
+            asyncio.run(store.aggregate_bars("btcusdt", 30))
+        # Raw-tick-only ranges still serve any interval
+        after = ticks[200].timestamp.replace(second=0) + timedelta(minutes=2)
+        expected = Analytics.compute_ohlcv_columns(
+            "btcusdt", ticks_to_columns([t for t in ticks if t.timestamp >= after]), 30)
+        assert_bars_equal(asyncio.run(store.aggregate_bars("btcusdt", 30, after)), expected)
+    finally:
+        asyncio.run(store.close())
+
+
+def test_retention_is_opt_in(tmp_path):
+    rng = np.random.default_rng(1)
+    db = TickDatabase(str(tmp_path / "ticks.db"))
+    start = datetime.now() - timedelta(days=10)
+    for symbol in ("btcusdt", "ethusdt"):
+        db.insert_batch([t.model_copy(update={"symbol": symbol}) for t in make_ticks(rng, start, 50)])
+    expire(db)
+
+    assert load_policies("") == {}
+    run_retention(db, policies="")
+    assert db.get_tick_count("btcusdt") == db.get_tick_count("ethusdt") == 50
+
+    # Without "*", only the listed symbols are pruned
+    run_retention(db, policies='{"btcusdt": {"tick_days": 1}}')
+    assert (db.get_tick_count("btcusdt"), db.get_tick_count("ethusdt")) == (0, 50)
+
+
+def legacy_db(path) -> TickDatabase:
+    """A database file created before auto_vacuum=INCREMENTAL was set, with expired ticks."""
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE legacy (x)")  # File now has tables: the pragma no longer applies
+    db = TickDatabase(path)
+    rng = np.random.default_rng(2)
+    for day in range(3, 6):
+        db.insert_batch(make_ticks(rng, datetime.now() - timedelta(days=day), 3000))
+    expire(db)
+    return db
+
+
+def test_legacy_file_is_converted_and_shrinks(tmp_path):
+    db = legacy_db(str(tmp_path / "ticks.db"))
+    before = db.storage_stats()
+    assert before["auto_vacuum"] == 0
+
+    service = run_retention(db)
+
+    after = db.storage_stats()
+    assert after["auto_vacuum"] == 2
+    assert after["page_count"] < before["page_count"] / 2
+    assert service.stats.bytes_reclaimed > 0
+
+
+def test_legacy_file_conversion_can_be_disabled(tmp_path):
+    db = legacy_db(str(tmp_path / "ticks.db"))
+    before = db.storage_stats()
+
+    run_retention(db, convert_vacuum=False)
+
+    after = db.storage_stats()
+    assert after["auto_vacuum"] == 0
+    assert after["page_count"] >= before["page_count"]
@@ -0,0 +1,123 @@
+import asyncio
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from database import TickDatabase
+from models import Tick
+from storage import DuckDBTickStore, SQLiteTickStore, StoreUnavailable, create_store
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+needs_duckdb = pytest.mark.skipif(duckdb is None, reason="duckdb not installed")
+
+
+class MirroredDuckDBStore(DuckDBTickStore):
+    """
+    DuckDBTickStore whose ``src`` is an in-memory DuckDB copy of the SQLite
+    ticks table, so its queries run even where the sqlite extension can't load.
+    """
+
+    def _attach(self, db_path):
+        self._duck.execute("ATTACH ':memory:' AS src")
+        self._duck.execute("""CREATE TABLE src.ticks (symbol TEXT, timestamp TEXT, price DOUBLE,
+                                                      size DOUBLE, side TEXT, trade_id BIGINT)""")
+        with sqlite3.connect(db_path) as conn:
+            rows = conn.execute("SELECT symbol, timestamp, price, size, side, trade_id FROM ticks").fetchall()
+        self._duck.executemany("INSERT INTO src.ticks VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+def sqlite_extension_available() -> bool:
+    try:
+        duckdb.connect().execute("LOAD sqlite")
+        return True
+    except duckdb.Error:
+        return False
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Two symbols of ticks; part of btcusdt's history compacted into bars."""
+    rng = np.random.default_rng(11)
+    db = TickDatabase(str(tmp_path / "it's.db"))  # Quote in the path: ATTACH must escape it
+    start = datetime(2026, 1, 5, 9, 0)
+    for symbol in ("btcusdt", "ethusdt"):
+        offsets = np.sort(rng.uniform(0, 4 * 3600, 800))
+        db.insert_batch([
+            Tick(symbol=symbol, timestamp=start + timedelta(seconds=float(s)),
+                 price=float(100 + rng.normal()), size=float(rng.uniform(0.1, 2.0)),
+                 side="buy" if rng.random() < 0.5 else "sell", trade_id=i)
+            for i, s in enumerate(offsets)
+        ])
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute("""UPDATE ticks SET created_at = datetime('now', '-5 days')
+                        WHERE symbol = 'btcusdt' AND timestamp < '2026-01-05T10:30'""")
+    removed, _ = db.compact_ticks("btcusdt", "9999-12-31 00:00:00", batch_size=500)
+    assert 0 < removed < 800
+    return db
+
+
+@pytest.fixture(params=["mirrored", "sqlite-extension"])
+def duck_store(request, db):
+    if request.param == "sqlite-extension" and not sqlite_extension_available():
+        pytest.skip("DuckDB sqlite extension unavailable (offline?)")
+    cls = MirroredDuckDBStore if request.param == "mirrored" else DuckDBTickStore
+    store = cls(db)
+    yield store
+    asyncio.run(store.close())
+
+
+@needs_duckdb
+def test_duckdb_matches_sqlite(db, duck_store):
+    reference = SQLiteTickStore(db)
+    start, end = datetime(2026, 1, 5, 10, 0), datetime(2026, 1, 5, 11, 0)
+
+    async def both(method, *args):
+        return await getattr(reference, method)(*args), await getattr(duck_store, method)(*args)
+
+    try:
+        for symbol in ("btcusdt", "ethusdt"):
+            for interval in (60, 300, 3600):
+                for bounds in ((None, None), (start, end)):
+                    expected, got = asyncio.run(both("aggregate_bars", symbol, interval, *bounds))
+                    assert expected, (symbol, interval, bounds)
+                    assert [b.timestamp for b in got] == [b.timestamp for b in expected]
+                    for g, e in zip(got, expected):
+                        assert (g.open, g.high, g.low, g.close) == pytest.approx((e.open, e.high, e.low, e.close))
+                        assert (g.volume, g.vwap) == pytest.approx((e.volume, e.vwap))
+
+            expected, got = asyncio.run(both("range_scan", symbol, start, end))
+            assert [t.model_dump() for t in got] == [t.model_dump() for t in expected]
+    finally:
+        asyncio.run(reference.close())
+
+
+def test_falls_back_without_duckdb_package(db, monkeypatch):
+    monkeypatch.setitem(sys.modules, "duckdb", None)  # import duckdb -> ImportError
+    store = create_store(db, "duckdb")
+    assert type(store) is SQLiteTickStore
+    asyncio.run(store.close())
+
+
+@needs_duckdb
+def test_falls_back_when_sqlite_extension_fails(db, monkeypatch):
+    def offline(self, db_path):
+        raise duckdb.IOException('Failed to download extension "sqlite_scanner"')
+
+    monkeypatch.setattr(DuckDBTickStore, "_attach", offline)
+    with pytest.raises(StoreUnavailable):
+        DuckDBTickStore(db)
+    store = create_store(db, "duckdb")
+    assert type(store) is SQLiteTickStore
+    asyncio.run(store.close())
+
+
+def test_unknown_backend_is_rejected(db):
+    with pytest.raises(ValueError):
+        create_store(db, "postgres")
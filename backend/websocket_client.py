@@ -94,11 +94,18 @@ class BinanceTickClient:
                 price = float(data['p'])
                 qty = float(data['q'])
             
+            # m = buyer is the maker, i.e. the aggressor sold
+            side = None
+            if 'm' in data:
+                side = 'sell' if data['m'] else 'buy'
+            
             return Tick(
                 symbol=data['s'].lower(),
                 timestamp=timestamp,
                 price=price,
-                size=qty
+                size=qty,
+                side=side,
+                trade_id=data.get('a', data.get('t'))
             )
         except (KeyError, ValueError, TypeError) as e:
             logger.error(f"Error normalizing tick: {e}, data: {data}")
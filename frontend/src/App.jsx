@@ -14,6 +14,7 @@ import OrderFlowChart from "./components/charts/OrderFlowChart";
 import OHLCChart from "./components/layout/OHLCChart";
 
 import { useWebSocket } from "./hooks/useWebSocket";
+import { useHistory } from "./hooks/useHistory";
 
 const API_URL = "http://localhost:8000";
 const WS_URL = "ws://localhost:8000/ws";
@@ -37,22 +38,43 @@ export default function App() {
   });
   const wsConnected = wsStatus === "connected";
 
-  // Filter WebSocket messages for current symbol
+  // Recent ticks on load / symbol switch, as packed columns
+  const { rows: history } = useHistory(
+    `${API_URL}/api/ticks/${symbol}?limit=2000`,
+    { binary: true }
+  );
+
+  // History, then WebSocket messages for current symbol that came after it
   useEffect(() => {
+    const last = history[history.length - 1];
+    const isNewer = (t) =>
+      !last ||
+      (t.trade_id != null && last.trade_id != null
+        ? t.trade_id > last.trade_id
+        : t.timestamp > last.timestamp);
     const filtered = messages
       .filter((m) => m.type === "tick" && m.data?.symbol === symbol)
-      .map((m) => m.data);
+      .map((m) => m.data)
+      .filter(isNewer);
 
-    setTicks(filtered.slice(-2000));
-  }, [messages, symbol]);
+    setTicks([...history, ...filtered].slice(-2000));
+  }, [history, messages, symbol]);
 
   // Fetch analytics + correlation
   useEffect(() => {
     const fetchAnalytics = async () => {
       try {
+        // Chart the scanner's top-ranked pair once it has one
+        let pair = ["btcusdt", "ethusdt"];
+        const pairsRes = await fetch(`${API_URL}/api/pairs?limit=1`);
+        if (pairsRes.ok) {
+          const top = (await pairsRes.json()).pairs?.[0];
+          if (top) pair = [top.symbol1, top.symbol2];
+        }
+
         const [analyticsRes, corrRes] = await Promise.all([
           fetch(`${API_URL}/api/analytics/${symbol}`),
-          fetch(`${API_URL}/api/correlation/btcusdt/ethusdt`),
+          fetch(`${API_URL}/api/correlation/${pair[0]}/${pair[1]}`),
         ]);
 
         if (analyticsRes.ok) setAnalytics(await analyticsRes.json());
@@ -107,7 +129,11 @@ export default function App() {
     let buyVolume = 0,
       sellVolume = 0;
     for (let i = 1; i < ticks.length; i++) {
-      if (parseFloat(ticks[i].price) > parseFloat(ticks[i - 1].price)) {
+      // Prefer the exchange aggressor side; fall back to the tick rule
+      const isBuy = ticks[i].side
+        ? ticks[i].side === "buy"
+        : parseFloat(ticks[i].price) > parseFloat(ticks[i - 1].price);
+      if (isBuy) {
         buyVolume += parseFloat(ticks[i].size);
       } else {
         sellVolume += parseFloat(ticks[i].size);
@@ -0,0 +1,36 @@
+// hooks/useHistory.js
+import { useEffect, useState } from "react";
+import { fetchHistory } from "../utils/wire";
+
+/**
+ * One-shot load of /api/ticks or /api/bars history. With `binary`, the server
+ * is asked for packed columns (see utils/wire.js); rows come back in the same
+ * shape as the JSON endpoints either way.
+ */
+export function useHistory(url, { binary = false } = {}) {
+  const [status, setStatus] = useState("loading");
+  const [rows, setRows] = useState([]);
+
+  useEffect(() => {
+    let isMounted = true;
+    setStatus("loading");
+    setRows([]);
+
+    fetchHistory(url, { binary })
+      .then((data) => {
+        if (!isMounted) return;
+        setRows(data);
+        setStatus("loaded");
+      })
+      .catch((e) => {
+        console.error("History fetch failed:", e);
+        if (isMounted) setStatus("error");
+      });
+
+    return () => {
+      isMounted = false;
+    };
+  }, [url, binary]);
+
+  return { status, rows };
+}
@@ -1,9 +1,10 @@
 // hooks/useWebSocket.js
 import { useEffect, useRef, useState } from "react";
+import { decodeMsgpack, msToIso } from "../utils/wire";
 
 export function useWebSocket(
   url,
-  { autoReconnect = true, bufferSize = 2000 } = {}
+  { autoReconnect = true, bufferSize = 2000, binary = false } = {}
 ) {
   const [status, setStatus] = useState("connecting");
   const [messages, setMessages] = useState([]);
@@ -17,7 +18,12 @@ export function useWebSocket(
       if (!isMounted) return;
 
       try {
-        wsRef.current = new WebSocket(url);
+        // binary: ask the server for MessagePack frames instead of JSON text
+        const wsUrl = binary
+          ? `${url}${url.includes("?") ? "&" : "?"}format=msgpack`
+          : url;
+        wsRef.current = new WebSocket(wsUrl);
+        wsRef.current.binaryType = "arraybuffer";
 
         wsRef.current.onopen = () => {
           if (!isMounted) return;
@@ -27,7 +33,16 @@ export function useWebSocket(
         wsRef.current.onmessage = (event) => {
           if (!isMounted) return;
           try {
-            const msg = JSON.parse(event.data);
+            let msg;
+            if (event.data instanceof ArrayBuffer) {
+              msg = decodeMsgpack(event.data);
+              // Binary frames carry epoch-ms timestamps; match the JSON shape
+              if (typeof msg.data?.timestamp === "number") {
+                msg.data.timestamp = msToIso(msg.data.timestamp);
+              }
+            } else {
+              msg = JSON.parse(event.data);
+            }
             setMessages((prev) => {
               const next = [...prev, msg];
               return next.slice(-bufferSize);
@@ -63,7 +78,7 @@ export function useWebSocket(
       if (reconnectRef.current) clearTimeout(reconnectRef.current);
       if (wsRef.current) wsRef.current.close();
     };
-  }, [url, autoReconnect, bufferSize]);
+  }, [url, autoReconnect, bufferSize, binary]);
 
   return { status, messages };
 }
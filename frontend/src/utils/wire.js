@@ -0,0 +1,165 @@
+// utils/wire.js
+// Decoders for the backend's binary wire formats (see backend/encoding.py).
+
+export const COLUMNAR_MEDIA_TYPE = "application/vnd.quant.columnar";
+export const MSGPACK_MEDIA_TYPE = "application/x-msgpack";
+
+const textDecoder = new TextDecoder();
+
+/**
+ * Decode a QCOL v1 buffer into { meta, length, columns } where each column is a
+ * zero-copy Float64Array / BigInt64Array view (timestamps are converted to a
+ * Float64Array of epoch-ms, which is exact for any realistic date).
+ */
+export function decodeColumnar(buffer) {
+  const view = new DataView(buffer);
+  const magic = textDecoder.decode(new Uint8Array(buffer, 0, 4));
+  if (magic !== "QCOL" || view.getUint16(4, true) !== 1) {
+    throw new Error("Not a QCOL v1 buffer");
+  }
+  const nCols = view.getUint16(6, true);
+  const nRows = view.getUint32(8, true);
+  const metaLen = view.getUint32(12, true);
+
+  let offset = 16;
+  const meta = JSON.parse(textDecoder.decode(new Uint8Array(buffer, offset, metaLen)));
+  offset += metaLen;
+
+  const schema = [];
+  for (let i = 0; i < nCols; i++) {
+    const nameLen = view.getUint8(offset);
+    const name = textDecoder.decode(new Uint8Array(buffer, offset + 1, nameLen));
+    const code = String.fromCharCode(view.getUint8(offset + 1 + nameLen));
+    schema.push([name, code]);
+    offset += 2 + nameLen;
+  }
+  offset += (8 - (offset % 8)) % 8;
+
+  const columns = {};
+  for (const [name, code] of schema) {
+    columns[name] =
+      code === "q"
+        ? Float64Array.from(new BigInt64Array(buffer, offset, nRows), Number)
+        : new Float64Array(buffer, offset, nRows);
+    offset += nRows * 8;
+  }
+  return { meta, length: nRows, columns };
+}
+
+/**
+ * Epoch-ms of a stored wall-clock time -> the zone-less ISO string the JSON
+ * endpoints return, so charts parse both the same way.
+ */
+export function msToIso(ms) {
+  return new Date(ms).toISOString().slice(0, -1);
+}
+
+// Numeric side column (models.SIDE_SIGN) -> the strings the JSON endpoints return
+const SIDE_NAME = { 1: "buy", [-1]: "sell" };
+
+/**
+ * Materialize row objects shaped like the JSON endpoints return. Timestamps are
+ * the stored wall-clock time, so they are rendered as zone-less ISO strings;
+ * side, trade_id and vwap sentinels map back to "buy"/"sell"/null and null.
+ */
+export function columnsToRows({ meta, length, columns }) {
+  const names = Object.keys(columns);
+  const rows = new Array(length);
+  for (let i = 0; i < length; i++) {
+    const row = { symbol: meta.symbol };
+    for (const name of names) {
+      const value = columns[name][i];
+      if (name === "timestamp") row[name] = msToIso(value);
+      else if (name === "side") row[name] = SIDE_NAME[value] ?? null;
+      else if (name === "trade_id") row[name] = value === -1 ? null : value; // NO_TRADE_ID
+      else if (name === "vwap") row[name] = Number.isNaN(value) ? null : value;
+      else row[name] = value;
+    }
+    rows[i] = row;
+  }
+  return rows;
+}
+
+/** Fetch /api/ticks or /api/bars history, optionally as packed columns. */
+export async function fetchHistory(url, { binary = false } = {}) {
+  const res = await fetch(url, {
+    headers: binary ? { Accept: COLUMNAR_MEDIA_TYPE } : {},
+  });
+  if (!res.ok) throw new Error(`HTTP ${res.status}`);
+  if (res.headers.get("content-type")?.startsWith(COLUMNAR_MEDIA_TYPE)) {
+    return columnsToRows(decodeColumnar(await res.arrayBuffer()));
+  }
+  return res.json();
+}
+
+// Minimal MessagePack decoder covering what msgpack.packb emits for our frames:
+// nil, bool, ints, floats, str, bin, array, map.
+export function decodeMsgpack(buffer) {
+  const bytes = new Uint8Array(buffer);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let pos = 0;
+
+  const str = (len) => {
+    const s = textDecoder.decode(bytes.subarray(pos, pos + len));
+    pos += len;
+    return s;
+  };
+  const bin = (len) => {
+    const b = bytes.slice(pos, pos + len);
+    pos += len;
+    return b;
+  };
+  const array = (len) => {
+    const out = new Array(len);
+    for (let i = 0; i < len; i++) out[i] = read();
+    return out;
+  };
+  const map = (len) => {
+    const out = {};
+    for (let i = 0; i < len; i++) {
+      const key = read();
+      out[key] = read();
+    }
+    return out;
+  };
+
+  function read() {
+    const b = bytes[pos++];
+    if (b <= 0x7f) return b;
+    if (b >= 0xe0) return b - 0x100;
+    if ((b & 0xf0) === 0x80) return map(b & 0x0f);
+    if ((b & 0xf0) === 0x90) return array(b & 0x0f);
+    if ((b & 0xe0) === 0xa0) return str(b & 0x1f);
+
+    let v;
+    switch (b) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: return bin(bytes[pos++]);
+      case 0xc5: v = view.getUint16(pos); pos += 2; return bin(v);
+      case 0xc6: v = view.getUint32(pos); pos += 4; return bin(v);
+      case 0xca: v = view.getFloat32(pos); pos += 4; return v;
+      case 0xcb: v = view.getFloat64(pos); pos += 8; return v;
+      case 0xcc: return bytes[pos++];
+      case 0xcd: v = view.getUint16(pos); pos += 2; return v;
+      case 0xce: v = view.getUint32(pos); pos += 4; return v;
+      case 0xcf: v = Number(view.getBigUint64(pos)); pos += 8; return v;
+      case 0xd0: v = view.getInt8(pos); pos += 1; return v;
+      case 0xd1: v = view.getInt16(pos); pos += 2; return v;
+      case 0xd2: v = view.getInt32(pos); pos += 4; return v;
+      case 0xd3: v = Number(view.getBigInt64(pos)); pos += 8; return v;
+      case 0xd9: return str(bytes[pos++]);
+      case 0xda: v = view.getUint16(pos); pos += 2; return str(v);
+      case 0xdb: v = view.getUint32(pos); pos += 4; return str(v);
+      case 0xdc: v = view.getUint16(pos); pos += 2; return array(v);
+      case 0xdd: v = view.getUint32(pos); pos += 4; return array(v);
+      case 0xde: v = view.getUint16(pos); pos += 2; return map(v);
+      case 0xdf: v = view.getUint32(pos); pos += 4; return map(v);
+      default:
+        throw new Error(`Unsupported msgpack type 0x${b.toString(16)}`);
+    }
+  }
+
+  return read();
+}